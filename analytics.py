@@ -0,0 +1,249 @@
+# Profit and loss and inventory valuation, read from summary tables that triggers on inventory
+# and sold_cards keep up to date. Opening the dashboard reads a handful of summary rows instead
+# of aggregating the whole sales history.
+
+# Sales are summed per bucket of each period. "all" has a single bucket holding the totals.
+# Timestamps are Unix seconds, bucketed by local calendar date. Weeks start on Monday and are
+# keyed by that Monday's date.
+PERIOD_BUCKETS = {
+    "all": "''",
+    "day": "date({row}.sold_date, 'unixepoch', 'localtime')",
+    "week": "date({row}.sold_date, 'unixepoch', 'localtime', 'weekday 0', '-6 days')",
+    "month": "strftime('%Y-%m', {row}.sold_date, 'unixepoch', 'localtime')",
+}
+
+# Days between adding a card and selling it, or NULL when either date is missing
+DAYS_TO_SELL = "({row}.sold_date - {row}.date_added) / 86400.0"
+
+MEASURES = ("cards_sold", "revenue", "cost", "timed_cards", "days_to_sell")
+
+
+def create_analytics_tables(connection):
+    """
+    Create the summary tables and the triggers that maintain them. Summaries that did not exist
+    yet are filled from the current data. Must run inside a write transaction.
+    """
+    existing = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sales_summary'"
+    ).fetchone()
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_summary (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            card_count INTEGER NOT NULL,
+            total_cost REAL NOT NULL
+        )
+    """)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS sales_summary (
+            period TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            cards_sold INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            cost REAL NOT NULL,
+            timed_cards INTEGER NOT NULL,
+            days_to_sell REAL NOT NULL,
+            PRIMARY KEY (period, bucket)
+        ) WITHOUT ROWID
+    """)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS card_margins (
+            name TEXT NOT NULL,
+            condition TEXT NOT NULL,
+            cards_sold INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            cost REAL NOT NULL,
+            timed_cards INTEGER NOT NULL,
+            days_to_sell REAL NOT NULL,
+            PRIMARY KEY (name, condition)
+        ) WITHOUT ROWID
+    """)
+    # Each card's profit kept in sorted order as the triggers write its row, so the most
+    # profitable cards are read off the front of the index instead of sorting every card
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS idx_card_margins_profit ON card_margins(revenue - cost) WHERE cards_sold > 0"
+    )
+    create_analytics_triggers(connection)
+    if not existing:
+        rebuild_summaries(connection)
+
+
+def create_analytics_triggers(connection):
+    connection.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS inventory_summary_insert AFTER INSERT ON inventory BEGIN
+            {_inventory_change("new", 1)}
+        END
+    """)
+    connection.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS inventory_summary_delete AFTER DELETE ON inventory BEGIN
+            {_inventory_change("old", -1)}
+        END
+    """)
+    connection.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS inventory_summary_update AFTER UPDATE OF buy_price ON inventory BEGIN
+            {_inventory_change("old", -1)}
+            {_inventory_change("new", 1)}
+        END
+    """)
+    connection.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS sales_summary_insert AFTER INSERT ON sold_cards BEGIN
+            {_sale_change("new", 1)}
+        END
+    """)
+    connection.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS sales_summary_delete AFTER DELETE ON sold_cards BEGIN
+            {_sale_change("old", -1)}
+        END
+    """)
+    connection.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS sales_summary_update
+        AFTER UPDATE OF name, condition, buy_price, sell_price, sold_date, date_added ON sold_cards BEGIN
+            {_sale_change("old", -1)}
+            {_sale_change("new", 1)}
+        END
+    """)
+
+
+def drop_analytics_triggers(connection):
+    """Drop the summary triggers, e.g. before a migration rewrites the columns they read."""
+    for table in ("inventory", "sales"):
+        for action in ("insert", "delete", "update"):
+            connection.execute(f"DROP TRIGGER IF EXISTS {table}_summary_{action}")
+
+
+def _inventory_change(row, sign):
+    return f"""
+        INSERT INTO inventory_summary (id, card_count, total_cost)
+        VALUES (1, {sign}, {sign} * COALESCE({row}.buy_price, 0))
+        ON CONFLICT(id) DO UPDATE SET
+            card_count = card_count + excluded.card_count,
+            total_cost = total_cost + excluded.total_cost;
+    """
+
+
+def _measure_values(row, sign):
+    days = DAYS_TO_SELL.format(row=row)
+    return (
+        f"{sign}, {sign} * COALESCE({row}.sell_price, 0), {sign} * COALESCE({row}.buy_price, 0), "
+        f"{sign} * ({days} IS NOT NULL), {sign} * COALESCE({days}, 0)"
+    )
+
+
+def _add_measures():
+    return ", ".join(f"{measure} = {measure} + excluded.{measure}" for measure in MEASURES)
+
+
+def _sale_change(row, sign):
+    statements = []
+    for period, bucket in PERIOD_BUCKETS.items():
+        bucket = bucket.format(row=row)
+        # A sale without a readable date only counts towards the totals
+        statements.append(f"""
+            INSERT INTO sales_summary (period, bucket, {", ".join(MEASURES)})
+            SELECT '{period}', {bucket}, {_measure_values(row, sign)}
+            WHERE {bucket} IS NOT NULL
+            ON CONFLICT(period, bucket) DO UPDATE SET {_add_measures()};
+        """)
+    statements.append(f"""
+        INSERT INTO card_margins (name, condition, {", ".join(MEASURES)})
+        SELECT COALESCE({row}.name, ''), COALESCE({row}.condition, ''), {_measure_values(row, sign)}
+        WHERE true
+        ON CONFLICT(name, condition) DO UPDATE SET {_add_measures()};
+    """)
+    return "\n".join(statements)
+
+
+def rebuild_summaries(connection):
+    """Recompute every summary from scratch, e.g. after editing the tables with the triggers off."""
+    connection.execute("DELETE FROM inventory_summary")
+    connection.execute("""
+        INSERT INTO inventory_summary (id, card_count, total_cost)
+        SELECT 1, COUNT(*), COALESCE(SUM(buy_price), 0) FROM inventory
+    """)
+    connection.execute("DELETE FROM sales_summary")
+    measures = _aggregate_measures("sold_cards")
+    for period, bucket in PERIOD_BUCKETS.items():
+        bucket = bucket.format(row="sold_cards")
+        connection.execute(f"""
+            INSERT INTO sales_summary (period, bucket, {", ".join(MEASURES)})
+            SELECT '{period}', {bucket}, {measures}
+            FROM sold_cards
+            WHERE {bucket} IS NOT NULL
+            GROUP BY {bucket}
+        """)
+    connection.execute("DELETE FROM card_margins")
+    connection.execute(f"""
+        INSERT INTO card_margins (name, condition, {", ".join(MEASURES)})
+        SELECT COALESCE(name, ''), COALESCE(condition, ''), {measures}
+        FROM sold_cards
+        GROUP BY COALESCE(name, ''), COALESCE(condition, '')
+    """)
+
+
+def _aggregate_measures(row):
+    days = DAYS_TO_SELL.format(row=row)
+    return (
+        f"COUNT(*), COALESCE(SUM(sell_price), 0), COALESCE(SUM(buy_price), 0), "
+        f"COUNT({days}), COALESCE(SUM({days}), 0)"
+    )
+
+
+def get_inventory_value(connection):
+    row = connection.execute("SELECT card_count, total_cost FROM inventory_summary WHERE id = 1").fetchone()
+    if row is None:
+        return {"card_count": 0, "total_cost": 0.0}
+    return {"card_count": row["card_count"], "total_cost": round(row["total_cost"], 2)}
+
+
+def get_sales(connection, period, limit=None):
+    """Sales per bucket of period ("day", "week" or "month"), newest first."""
+    if period not in PERIOD_BUCKETS:
+        raise ValueError(f"Unknown period: {period}")
+    rows = connection.execute(
+        "SELECT * FROM sales_summary WHERE period = ? AND cards_sold > 0 ORDER BY bucket DESC LIMIT ?",
+        (period, -1 if limit is None else limit)
+    ).fetchall()
+    return [_summarize(row, bucket=row["bucket"]) for row in rows]
+
+
+def get_sales_totals(connection):
+    row = connection.execute("SELECT * FROM sales_summary WHERE period = 'all'").fetchone()
+    if row is None:
+        return _summarize({measure: 0 for measure in MEASURES})
+    return _summarize(row)
+
+
+def get_card_margins(connection, limit=None):
+    """Profit and margin per card name and condition, most profitable first."""
+    # Matches idx_card_margins_profit exactly, so this walks the index and stops after limit rows
+    rows = connection.execute(
+        "SELECT * FROM card_margins WHERE cards_sold > 0 ORDER BY revenue - cost DESC LIMIT ?",
+        (-1 if limit is None else limit,)
+    ).fetchall()
+    return [_summarize(row, name=row["name"], condition=row["condition"]) for row in rows]
+
+
+def get_dashboard(connection, periods=12, margins=20):
+    """Everything the Reports tab shows, read in one go."""
+    return {
+        "inventory": get_inventory_value(connection),
+        "totals": get_sales_totals(connection),
+        "day": get_sales(connection, "day", periods),
+        "week": get_sales(connection, "week", periods),
+        "month": get_sales(connection, "month", periods),
+        "margins": get_card_margins(connection, margins),
+    }
+
+
+def _summarize(row, **keys):
+    revenue = round(row["revenue"], 2)
+    cost = round(row["cost"], 2)
+    profit = round(revenue - cost, 2)
+    keys.update(
+        cards_sold=row["cards_sold"],
+        revenue=revenue,
+        cost=cost,
+        profit=profit,
+        margin=profit / revenue if revenue else None,
+        average_days_to_sell=row["days_to_sell"] / row["timed_cards"] if row["timed_cards"] else None,
+    )
+    return keys
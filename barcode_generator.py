@@ -1,37 +1,149 @@
+import functools
+import itertools
 import os
-import random
-from barcode import UPCA
-from barcode.writer import ImageWriter
-from PIL import Image, ImageDraw, ImageFont
+import threading
+from collections import deque
 
+# python-barcode, PIL and the process pool are imported where they are used, so modules that only
+# need calculate_upc_check_digit, like inventory_manager, start without them.
+# Barcode numbers come from InventoryManager's sequence; this module only renders them.
 
-def generate_barcode(card_name, card_condition):
-    # Get the desktop directory of the current user
+# Below this many cards, starting worker processes costs more than it saves
+MIN_PARALLEL_CARDS = 16
+
+CAPTION_FONT_SIZE = 34
+
+# Fonts tried in order for the caption. Windows finds arial.ttf in its fonts folder; other
+# platforms need a full path. Extra paths can be listed in PKMN_FONT_PATH (os.pathsep separated).
+FONT_SEARCH_PATH = [
+    "arial.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    "/usr/share/fonts/liberation-sans/LiberationSans-Regular.ttf",
+    "/Library/Fonts/Arial.ttf",
+    "/System/Library/Fonts/Supplemental/Arial.ttf",
+    "DejaVuSans.ttf",
+]
+
+# Writers are reused between renders, one per thread because a writer holds the image being drawn
+_local = threading.local()
+
+# Output directories already created by this process
+_created_directories = set()
+
+
+def render_labels(cards, size=None, max_workers=None, chunk_size=32, progress=None):
+    """
+    Yield the label image of each (barcode_number, card_name, card_condition) card in order,
+    greyscale and shrunk to fit size when size is given. Labels render in a process pool with one
+    worker per core, in chunks to keep pickling overhead low, and only a few chunks run ahead of
+    the caller, so memory stays flat however many cards there are.
+    progress(done, total) is called as each chunk finishes; total is None when cards has no length.
+    """
+    total = len(cards) if hasattr(cards, "__len__") else None
+    cards = iter(cards)
+    first = list(itertools.islice(cards, MIN_PARALLEL_CARDS))
+    workers = max_workers or os.cpu_count() or 1
+    if workers == 1 or len(first) < MIN_PARALLEL_CARDS:
+        done = 0
+        for card in itertools.chain(first, cards):
+            yield _render_fitted(card, size)
+            done += 1
+            if progress and done % chunk_size == 0:
+                progress(done, total)
+        if progress and done % chunk_size:
+            progress(done, total)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    remaining = itertools.chain(first, cards)
+    chunks = iter(lambda: list(itertools.islice(remaining, chunk_size)), [])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        running = deque(pool.submit(_render_chunk, chunk, size) for chunk in itertools.islice(chunks, workers * 2))
+        done = 0
+        while running:
+            images = running.popleft().result()
+            done += len(images)
+            if progress:
+                progress(done, total)
+            chunk = next(chunks, None)
+            if chunk is not None:
+                running.append(pool.submit(_render_chunk, chunk, size))
+            yield from images
+
+
+def _render_chunk(cards, size):
+    # Runs in a worker process
+    return [_render_fitted(card, size) for card in cards]
+
+
+def _render_fitted(card, size):
+    label = render_label(*card)
+    if size is not None:
+        label = label.convert("L")
+        label.thumbnail(size)
+    return label
+
+
+def render_barcode(barcode_number, card_name, card_condition, output_directory=None):
+    barcode_directory = output_directory or get_barcode_directory()
+    if barcode_directory not in _created_directories:
+        os.makedirs(barcode_directory, exist_ok=True)
+        _created_directories.add(barcode_directory)
+
+    # Encode and write the label once
+    label_path = os.path.join(barcode_directory, f"{barcode_number}.png")
+    render_label(barcode_number, card_name, card_condition).save(label_path)
+    return label_path
+
+
+def render_label(barcode_number, card_name, card_condition):
+    """Render a captioned label as an in-memory PIL image without touching the disk."""
+    from barcode import UPCA
+
+    # Render the barcode in memory instead of saving it and opening it again
+    barcode_image = UPCA(barcode_number, writer=get_writer()).render()
+
+    # Add card name and condition below the bars
+    return add_text_to_barcode(barcode_image, card_name, card_condition)
+
+
+@functools.lru_cache(maxsize=None)
+def get_barcode_directory():
+    # Barcodes are saved in a 'barcodes' directory on the current user's desktop
     desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
+    return os.path.join(desktop_path, "barcodes")
 
-    # Create a 'barcodes' directory on the desktop
-    barcode_directory = os.path.join(desktop_path, "barcodes")
-    os.makedirs(barcode_directory, exist_ok=True)
 
-    # Generate a random 12-digit UPC-A barcode number
-    barcode_number = "".join([str(random.randint(0, 9)) for _ in range(11)])
-    check_digit = calculate_upc_check_digit(barcode_number)
-    barcode_number += str(check_digit)
+def get_writer():
+    writer = getattr(_local, "writer", None)
+    if writer is None:
+        from barcode.writer import ImageWriter
+        writer = _local.writer = ImageWriter()
+    return writer
 
-    # Generate the barcode and save it in the 'barcodes' folder
-    barcode = UPCA(barcode_number, writer=ImageWriter())
-    filename = os.path.join(barcode_directory, barcode_number)
-    barcode.save(filename)
 
-    # Open the generated barcode image
-    barcode_image_path = f"{filename}.png"
-    barcode_image = Image.open(barcode_image_path)
+@functools.lru_cache(maxsize=None)
+def get_font(size=CAPTION_FONT_SIZE):
+    """Load the first caption font found on the search path, once per size."""
+    from PIL import ImageFont
 
-    # Add card name and condition to the barcode image
-    updated_image_path = add_text_to_barcode(barcode_image, card_name, card_condition, barcode_image_path)
+    extra_paths = os.environ.get("PKMN_FONT_PATH", "")
+    for font_path in [path for path in extra_paths.split(os.pathsep) if path] + FONT_SEARCH_PATH:
+        try:
+            return ImageFont.truetype(font_path, size)
+        except IOError:
+            continue
+    # Fallback to default font if no TTF font is available
+    return ImageFont.load_default()
 
-    # Return the barcode number and the updated image path
-    return barcode_number, updated_image_path
+
+def set_font_search_path(font_paths):
+    """Replace the caption font search path and forget fonts loaded from the old one."""
+    FONT_SEARCH_PATH[:] = font_paths
+    get_font.cache_clear()
 
 
 def calculate_upc_check_digit(barcode_number):
@@ -46,10 +158,12 @@ def calculate_upc_check_digit(barcode_number):
     return check_digit
 
 
-def add_text_to_barcode(barcode_image, card_name, card_condition, save_path):
+def add_text_to_barcode(barcode_image, card_name, card_condition):
     """
-    Add the card name and condition as text below the barcode image.
+    Return a new image with the card name and condition as text below the barcode image.
     """
+    from PIL import Image, ImageDraw
+
     # Create a new image with extra space for text
     new_width = barcode_image.width
     new_height = barcode_image.height + 50  # Add space for text
@@ -61,12 +175,7 @@ def add_text_to_barcode(barcode_image, card_name, card_condition, save_path):
     # Add text (card name and condition)
     draw = ImageDraw.Draw(new_image)
 
-    try:
-        # Use a default font (adjust font path if necessary)
-        font = ImageFont.truetype("arial.ttf", 34)
-    except IOError:
-        # Fallback to default font if TTF font is not available
-        font = ImageFont.load_default()
+    font = get_font()
 
     text = f"{card_name} - {card_condition}"
 
@@ -79,6 +188,4 @@ def add_text_to_barcode(barcode_image, card_name, card_condition, save_path):
     text_y = barcode_image.height + 5  # Place the text below the barcode
     draw.text((text_x, text_y), text, fill="black", font=font)
 
-    # Save the new image with text
-    new_image.save(save_path)
-    return save_path
+    return new_image
@@ -0,0 +1,50 @@
+"""
+Compare rendering barcode labels one at a time against render_labels' process pool, which
+label sheets render through.
+
+Run from the project root:
+    python -m benchmarks.bench_barcodes [card count]
+
+Labels are rendered in memory only.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from barcode_generator import render_label, render_labels
+from inventory_manager import InventoryManager
+
+DEFAULT_COUNT = 200
+
+
+def allocate_barcodes(count):
+    """Barcode numbers from the real sequence, allocated in a throwaway database."""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = InventoryManager(os.path.join(directory, "bench.db"))
+        try:
+            return manager.allocate_barcodes(count)
+        finally:
+            manager.close()
+
+
+def run(count):
+    cards = [(barcode, f"Benchmark Card {index}", "Near Mint") for index, barcode in enumerate(allocate_barcodes(count))]
+
+    start = time.perf_counter()
+    for card in cards:
+        render_label(*card)
+    serial_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in render_labels(cards):
+        pass
+    pool_seconds = time.perf_counter() - start
+
+    print(f"{count} labels on {os.cpu_count()} cores")
+    print(f"  per card:     {count / serial_seconds:8.1f} images/s")
+    print(f"  process pool: {count / pool_seconds:8.1f} images/s ({serial_seconds / pool_seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT)
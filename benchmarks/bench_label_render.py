@@ -0,0 +1,72 @@
+"""
+Measure what rendering labels in memory saves over the old save, reopen and save again pipeline.
+
+Run from the project root:
+    python -m benchmarks.bench_label_render [card count]
+
+Reports wall time, CPU time and bytes of PNG written or read per card.
+Images are written to a temporary directory.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from barcode import UPCA
+from barcode.writer import ImageWriter
+from PIL import Image
+
+from barcode_generator import add_text_to_barcode, render_barcode
+from benchmarks.bench_barcodes import allocate_barcodes
+
+DEFAULT_COUNT = 200
+
+
+def render_legacy(barcode_number, card_name, card_condition, output_directory):
+    """
+    The pipeline before labels were rendered in memory. It saved the barcode PNG, opened it
+    again, composited the caption and saved over the same file. Returns the bytes of disk I/O.
+    """
+    filename = os.path.join(output_directory, barcode_number)
+    UPCA(barcode_number, writer=ImageWriter()).save(filename)
+    path = f"{filename}.png"
+    first_write = os.path.getsize(path)
+    with Image.open(path) as barcode_image:
+        barcode_image.load()
+        label_image = add_text_to_barcode(barcode_image, card_name, card_condition)
+    label_image.save(path)
+    # One write of the bare barcode, one read of it and one write of the final label
+    return first_write * 2 + os.path.getsize(path)
+
+
+def measure(render, cards):
+    with tempfile.TemporaryDirectory() as directory:
+        io_bytes = 0
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        for card in cards:
+            io_bytes += render(*card, directory)
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    return wall / len(cards), cpu / len(cards), io_bytes / len(cards)
+
+
+def render_in_memory(barcode_number, card_name, card_condition, output_directory):
+    return os.path.getsize(render_barcode(barcode_number, card_name, card_condition, output_directory))
+
+
+def run(count):
+    cards = [(barcode, f"Benchmark Card {index}", "Near Mint") for index, barcode in enumerate(allocate_barcodes(count))]
+    legacy = measure(render_legacy, cards)
+    in_memory = measure(render_in_memory, cards)
+
+    print(f"{count} labels, per card:")
+    print(f"{'':>12} {'wall ms':>9} {'cpu ms':>9} {'I/O KiB':>9}")
+    for label, (wall, cpu, io_bytes) in (("legacy", legacy), ("in-memory", in_memory)):
+        print(f"{label:>12} {wall * 1000:>9.2f} {cpu * 1000:>9.2f} {io_bytes / 1024:>9.1f}")
+    print(
+        f"{'saved':>12} {(legacy[0] - in_memory[0]) * 1000:>9.2f} {(legacy[1] - in_memory[1]) * 1000:>9.2f} "
+        f"{(legacy[2] - in_memory[2]) / 1024:>9.1f}"
+    )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT)
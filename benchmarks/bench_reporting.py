@@ -0,0 +1,92 @@
+"""
+Compare computing sales statistics row by row through sqlite3.Row objects against the
+columnar SalesReport, cold (one bulk fetch into arrays) and warm (columns already cached).
+
+Run from the project root:
+    python -m benchmarks.bench_reporting [row counts...]
+
+Each size is seeded into a temporary database, so your inventory.db is never touched.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import reporting
+from inventory_manager import InventoryManager
+
+DEFAULT_SIZES = (10_000, 100_000, 500_000)
+
+
+def seed_sold_cards(manager, count, batch_size=50_000):
+    rng = random.Random(count)
+    start_date = int(time.time()) - 3 * 365 * 86400
+    for start in range(0, count, batch_size):
+        rows = []
+        for number in range(start, min(start + batch_size, count)):
+            buy_price = round(rng.uniform(0.5, 200), 2)
+            sold_date = start_date + rng.randint(0, 3 * 365 * 86400)
+            rows.append((
+                f"Card {number % 500}", "Near Mint", str(number), f"bench{number}",
+                sold_date, buy_price, round(buy_price * rng.uniform(0.7, 2.0), 2)
+            ))
+        with manager.transaction():
+            manager.connection.executemany("""
+                INSERT INTO sold_cards (name, condition, card_number, barcode, sold_date, buy_price, sell_price)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+
+
+def row_by_row(manager):
+    # What a report would do without the column cache: walk every row as a sqlite3.Row
+    sell_prices, profits, daily = [], [], {}
+    for row in manager.connection.execute("SELECT * FROM sold_cards"):
+        sell_prices.append(row["sell_price"])
+        profit = row["sell_price"] - row["buy_price"]
+        profits.append(profit)
+        day = row["sold_date"] // 86400
+        daily[day] = daily.get(day, 0) + profit
+    statistics.quantiles(sell_prices, n=4, method="inclusive")
+    statistics.quantiles(profits, n=4, method="inclusive")
+    return daily
+
+
+def columnar(manager):
+    manager.sales_report.cached_statistics = {}
+    return manager.sales_report.statistics(days=None)
+
+
+def cold(manager):
+    manager.sales_report.cached_columns = None
+    return columnar(manager)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def run(sizes):
+    engine = "numpy" if reporting.get_numpy() is not None else "array"
+    print(f"{'rows':>10} {'row-by-row ms':>14} {'cold ms':>10} {'warm ms':>10} {'cached ms':>10}  ({engine})")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            manager = InventoryManager(os.path.join(directory, "bench.db"))
+            seed_sold_cards(manager, size)
+            row_time = timed(row_by_row, manager)
+            cold_time = timed(cold, manager)
+            warm_time = timed(columnar, manager)
+            manager.get_sales_statistics()
+            cached_time = timed(manager.get_sales_statistics)
+            print(
+                f"{size:>10} {row_time * 1000:>14.1f} {cold_time * 1000:>10.1f} {warm_time * 1000:>10.1f} "
+                f"{cached_time * 1000:>10.3f}"
+            )
+            manager.close()
+
+
+if __name__ == "__main__":
+    run([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,91 @@
+"""
+Compare the trigram FTS5 search index against the old LIKE '%q%' scan.
+
+Run from the project root:
+    python -m benchmarks.bench_search [row counts...]
+
+Each size is seeded into a temporary database, so your inventory.db is never touched.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from inventory_manager import InventoryManager
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+NAMES = ("Pikachu", "Charizard", "Blastoise", "Venusaur", "Mewtwo", "Gengar", "Eevee", "Snorlax", "Lugia", "Umbreon")
+CONDITIONS = ("Mint", "Near Mint", "Lightly Played", "Moderately Played", "Damaged")
+QUERIES = ("Charizard", "izar", "Near Mint", "4/102", "1234")
+REPEATS = 5
+
+
+def seed_inventory(manager, count, batch_size=50_000):
+    rng = random.Random(count)
+    date_added = int(time.time())
+    for start in range(0, count, batch_size):
+        rows = [
+            (
+                f"{rng.choice(NAMES)} {rng.choice(('', 'EX', 'GX', 'V', 'VMAX'))}".strip(),
+                rng.choice(CONDITIONS),
+                f"{rng.randint(1, 250)}/{rng.randint(100, 250)}",
+                round(rng.uniform(0.5, 500), 2),
+                "".join(str(rng.randint(0, 9)) for _ in range(12)),
+                date_added,
+            )
+            for _ in range(min(batch_size, count - start))
+        ]
+        with manager.transaction():
+            manager.connection.executemany("""
+                INSERT INTO inventory (name, condition, card_number, buy_price, barcode, date_added)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+
+
+def like_scan(manager, query):
+    # The search path used before the FTS index was added
+    return manager.connection.execute("""
+        SELECT * FROM inventory
+        WHERE
+            name LIKE ? OR
+            condition LIKE ? OR
+            card_number LIKE ? OR
+            barcode LIKE ?
+        ORDER BY id DESC
+    """, (f"%{query}%", f"%{query}%", f"%{query}%", f"%{query}%")).fetchall()
+
+
+def best_time(function, *args):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes):
+    print(f"{'rows':>10} {'query':>12} {'matches':>9} {'LIKE ms':>10} {'FTS ms':>10} {'ranked ms':>10} {'speedup':>8}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            manager = InventoryManager(os.path.join(directory, "bench.db"))
+            # Measure the index itself, not the search result cache
+            manager.search_cache.max_entries = 0
+            if not manager.fts_enabled:
+                sys.exit("This SQLite build has no FTS5 trigram tokenizer, nothing to compare.")
+            seed_inventory(manager, size)
+            for query in QUERIES:
+                matches = len(manager.search_inventory(query, latest_first=True))
+                like_time = best_time(like_scan, manager, query)
+                fts_time = best_time(manager.search_inventory, query, True)
+                ranked_time = best_time(manager.search_inventory, query, True, True)
+                print(
+                    f"{size:>10} {query:>12} {matches:>9} {like_time * 1000:>10.2f} {fts_time * 1000:>10.2f} "
+                    f"{ranked_time * 1000:>10.2f} {like_time / fts_time:>7.1f}x"
+                )
+            manager.connection.close()
+
+
+if __name__ == "__main__":
+    run([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
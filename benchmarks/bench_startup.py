@@ -0,0 +1,102 @@
+"""
+Measure how long the app takes to start: the import of ui in a fresh interpreter, and the time
+until the window first shows and until the first page of the visible tab is on screen, with
+and without the fast start that defers the other tabs.
+
+Run from the project root:
+    python -m benchmarks.bench_startup [card count]
+
+The app is started against a temporary database, so your inventory.db is never touched.
+Time to first paint needs a display; without one only the import times are reported.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.bench_search import seed_inventory
+from inventory_manager import InventoryManager
+
+DEFAULT_COUNT = 100_000
+REPEATS = 5
+HEAVY_MODULES = ("PIL", "barcode", "numpy", "concurrent.futures.process")
+
+# Run in a fresh interpreter for each measurement, so nothing is imported or cached yet
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import ui
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "loaded": [name for name in sys.argv[1:] if name in sys.modules]}))
+"""
+
+PAINT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from ui import InventoryApp
+imported = time.perf_counter()
+app = InventoryApp(fast_start=sys.argv[1] == "1")
+app.root.update()
+shown = time.perf_counter()
+while not app.inventory_tree.get_children() and time.perf_counter() - start < 60:
+    app.root.update()
+    time.sleep(0.001)
+painted = time.perf_counter()
+app.close()
+print(json.dumps({"import": imported - start, "shown": shown - start, "first_rows": painted - start}))
+"""
+
+
+def run_script(script, args, env=None):
+    result = subprocess.run(
+        [sys.executable, "-c", script, *args], capture_output=True, text=True, env=env, cwd=os.getcwd()
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def best_of(script, args, key, env=None):
+    results = [run_script(script, args, env) for _ in range(REPEATS)]
+    return min(results, key=lambda result: result[key])
+
+
+def seed_database(path, count):
+    manager = InventoryManager(path)
+    seed_inventory(manager, count)
+    # Give the Sold Cards tab a history of its own to load
+    with manager.transaction():
+        manager.connection.execute("""
+            INSERT INTO sold_cards (name, condition, card_number, buy_price, sell_price, sold_date, date_added, barcode)
+            SELECT name, condition, card_number, buy_price, buy_price * 1.5, date_added, date_added, barcode
+            FROM inventory WHERE id % 4 = 0
+        """)
+    manager.close()
+
+
+def run(count):
+    imported = best_of(IMPORT_SCRIPT, HEAVY_MODULES, "seconds")
+    print(f"import ui:            {imported['seconds'] * 1000:8.1f} ms")
+    print(f"  heavy modules loaded: {', '.join(imported['loaded']) or 'none'}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        seed_database(path, count)
+        env = dict(os.environ, PKMN_DB_PATH=path)
+        print(f"{count} cards")
+        for fast_start in (False, True):
+            label = "fast start" if fast_start else "all tabs"
+            try:
+                result = best_of(PAINT_SCRIPT, ["1" if fast_start else "0"], "first_rows", env)
+            except RuntimeError as error:
+                print(f"  {label}: time to first paint not measured ({error})")
+                return
+            print(
+                f"  {label:>10}: window shown {result['shown'] * 1000:8.1f} ms, "
+                f"first rows {result['first_rows'] * 1000:8.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT)
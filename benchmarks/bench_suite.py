@@ -0,0 +1,218 @@
+"""
+Time the hot paths of InventoryManager and barcode_generator against synthetic inventories of
+several sizes, and write the results as JSON so runs can be compared.
+
+Run from the project root:
+    python -m benchmarks.bench_suite [--sizes 1000 10000 100000 1000000] [--output results.json]
+    python -m benchmarks.bench_suite --baseline results.json
+
+With --baseline, each median is compared against the same operation and size in an earlier
+results file, and the run exits with status 1 if any got slower by more than --threshold.
+
+Nothing here needs a display. Each size is seeded into a temporary database and labels are
+written to a temporary directory, so your inventory.db and Desktop are never touched.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+import barcode_generator
+import reporting
+from inventory_manager import InventoryManager
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_REPEATS = 20
+# Slow operations stop repeating after this many seconds, once they have run MIN_CALLS times
+TIME_BUDGET_SECONDS = 5.0
+MIN_CALLS = 3
+SOLD_FRACTION = 0.25
+SEED_BATCH_SIZE = 50_000
+
+NAMES = ("Pikachu", "Charizard", "Blastoise", "Venusaur", "Mewtwo", "Gengar", "Eevee", "Snorlax", "Lugia", "Umbreon")
+CONDITIONS = ("Mint", "Near Mint", "Lightly Played", "Moderately Played", "Damaged")
+QUERIES = ("Charizard", "izar", "Near Mint", "4/102")
+
+
+def seed(manager, inventory_count, sold_count, rng):
+    """Fill inventory and sold_cards with random cards spread over the last three years."""
+    now = int(time.time())
+    for table, count in (("inventory", inventory_count), ("sold_cards", sold_count)):
+        for start in range(0, count, SEED_BATCH_SIZE):
+            size = min(SEED_BATCH_SIZE, count - start)
+            with manager.transaction():
+                # Real barcodes from the sequence, so the unique barcode index never trips
+                barcodes = manager.allocate_barcodes(size)
+                rows = []
+                for barcode in barcodes:
+                    buy_price = round(rng.uniform(0.5, 500), 2)
+                    date_added = now - rng.randint(0, 3 * 365 * 86400)
+                    row = [
+                        f"{rng.choice(NAMES)} {rng.choice(('', 'EX', 'GX', 'V', 'VMAX'))}".strip(),
+                        rng.choice(CONDITIONS),
+                        f"{rng.randint(1, 250)}/{rng.randint(100, 250)}",
+                        buy_price,
+                        barcode,
+                        date_added,
+                    ]
+                    if table == "sold_cards":
+                        row += [round(buy_price * rng.uniform(0.7, 2.0), 2), rng.randint(date_added, now)]
+                    rows.append(row)
+                columns = "name, condition, card_number, buy_price, barcode, date_added"
+                if table == "sold_cards":
+                    columns += ", sell_price, sold_date"
+                manager.connection.executemany(
+                    f"INSERT INTO {table} ({columns}) VALUES ({', '.join('?' * len(rows[0]))})", rows
+                )
+
+
+def measure(function, repeats):
+    """Call function up to repeats times and return the per-call timings in milliseconds."""
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < repeats:
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+        if len(timings) >= MIN_CALLS and time.perf_counter() - started > TIME_BUDGET_SECONDS:
+            break
+    return {
+        "calls": len(timings),
+        "min_ms": min(timings),
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.fmean(timings),
+        "max_ms": max(timings),
+    }
+
+
+def refresh_all_tabs(manager):
+    # What the app reads to show every tab from the top: the first page of each list and the reports
+    manager.get_inventory_page(latest_first=True)
+    manager.get_inventory_page()
+    manager.get_sold_cards_page()
+    manager.get_dashboard()
+    manager.get_sales_statistics()
+
+
+def benchmark_size(size, repeats, directory):
+    rng = random.Random(size)
+    manager = InventoryManager(os.path.join(directory, f"bench-{size}.db"))
+    # Measure the queries themselves, not the search result cache
+    manager.search_cache.max_entries = 0
+
+    sold_count = int(size * SOLD_FRACTION)
+    start = time.perf_counter()
+    seed(manager, size - sold_count, sold_count, rng)
+    seed_seconds = time.perf_counter() - start
+
+    queries = itertools.cycle(QUERIES)
+    card_ids = [row[0] for row in manager.connection.execute("SELECT id FROM inventory")]
+    # Every sell_card call sells a different card
+    to_sell = iter(rng.sample(card_ids, min(len(card_ids), repeats)))
+    numbers = itertools.count()
+
+    operations = {
+        "add_card": lambda: manager.add_card("Benchmark Card", "Near Mint", "1/100", 4.99),
+        "search_inventory": lambda: manager.search_inventory(next(queries), latest_first=True),
+        "search_sold_cards": lambda: manager.search_sold_cards(next(queries)),
+        "sell_card": lambda: manager.sell_card(next(to_sell), 9.99),
+        "get_inventory_latest_first": manager.get_inventory_latest_first,
+        "refresh_all_tabs": lambda: refresh_all_tabs(manager),
+        # A new card's barcode: the next number from the sequence, then its label
+        "generate_barcode": lambda: barcode_generator.render_barcode(
+            manager.allocate_barcodes(1)[0], f"Benchmark Card {next(numbers)}", "Near Mint"
+        ),
+    }
+    results = []
+    for name, function in operations.items():
+        result = {"size": size, "operation": name}
+        result.update(measure(function, min(repeats, len(card_ids)) if name == "sell_card" else repeats))
+        results.append(result)
+        print(f"{size:>10} {name:>28} {result['median_ms']:>10.3f} ms ({result['calls']} calls)", file=sys.stderr)
+    manager.close()
+    return {"size": size, "seed_seconds": seed_seconds}, results
+
+
+def environment():
+    return {
+        "timestamp": int(time.time()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sqlite": sqlite3.sqlite_version,
+        "numpy": reporting.get_numpy() is not None,
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print each median against the baseline's and return the operations that slowed down."""
+    previous = {(entry["size"], entry["operation"]): entry for entry in baseline["results"]}
+    regressions = []
+    for entry in results:
+        old = previous.get((entry["size"], entry["operation"]))
+        if old is None:
+            continue
+        ratio = entry["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(entry)
+        print(
+            f"{entry['size']:>10} {entry['operation']:>28} {old['median_ms']:>10.3f} -> "
+            f"{entry['median_ms']:>10.3f} ms {ratio:>6.2f}x{flag}", file=sys.stderr
+        )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark inventory operations on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="cards per database")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="calls per operation")
+    parser.add_argument("--output", help="write the JSON results here instead of to stdout")
+    parser.add_argument("--baseline", help="earlier JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before failing (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    seeding, results = [], []
+    home = {name: os.environ.get(name) for name in ("HOME", "USERPROFILE")}
+    with tempfile.TemporaryDirectory() as directory:
+        # render_barcode writes under ~/Desktop/barcodes; point home at the temporary directory
+        os.environ["HOME"] = os.environ["USERPROFILE"] = directory
+        barcode_generator.get_barcode_directory.cache_clear()
+        try:
+            for size in args.sizes:
+                size_seeding, size_results = benchmark_size(size, args.repeats, directory)
+                seeding.append(size_seeding)
+                results.extend(size_results)
+        finally:
+            for name, value in home.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+            barcode_generator.get_barcode_directory.cache_clear()
+
+    report = {"environment": environment(), "repeats": args.repeats, "seeding": seeding, "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline:
+            regressions = compare(results, json.load(baseline), args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+import argparse
+import csv
+import functools
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from database import DatabaseConfig, transaction
+from inventory_manager import InventoryManager
+
+# PyArrow is optional and only needed for Parquet files
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Rows fetched and written at a time, so memory stays flat however large the table is
+DEFAULT_CHUNK_SIZE = 10_000
+
+# Columns written per table, in file order
+EXPORT_COLUMNS = {
+    "inventory": ("id", "name", "condition", "card_number", "buy_price", "barcode", "date_added"),
+    "sold_cards": (
+        "id", "sale_id", "name", "condition", "card_number", "buy_price", "sell_price", "barcode",
+        "date_added", "sold_date",
+    ),
+}
+
+# The date each table is filtered and checkpointed on; both are indexed
+DATE_COLUMNS = {"inventory": "date_added", "sold_cards": "sold_date"}
+TIMESTAMP_COLUMNS = ("date_added", "sold_date")
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet"}
+
+
+class ExportReport:
+    """Outcome of an export: rows written, where to, and throughput."""
+
+    def __init__(self, table, path, checkpoint=None):
+        self.table = table
+        self.path = path
+        self.checkpoint = checkpoint
+        self.rows = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        text = (
+            f"Exported {self.rows} rows from {self.table} to {os.path.basename(self.path)} "
+            f"in {self.seconds:.1f}s ({self.rows_per_second:.0f} rows/s)."
+        )
+        if self.checkpoint:
+            text += f" Checkpoint {self.checkpoint!r} updated."
+        return text
+
+
+def create_checkpoint_table(connection):
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS export_checkpoints (
+            name TEXT PRIMARY KEY,
+            table_name TEXT NOT NULL,
+            last_date INTEGER NOT NULL,
+            last_id INTEGER NOT NULL,
+            exported_at INTEGER NOT NULL,
+            row_count INTEGER NOT NULL
+        )
+    """)
+
+
+def get_checkpoints(connection):
+    with transaction(connection):
+        create_checkpoint_table(connection)
+    return [dict(row) for row in connection.execute("SELECT * FROM export_checkpoints ORDER BY name")]
+
+
+def reset_checkpoint(connection, name):
+    """Forget a checkpoint, so the next export under its name writes every row again."""
+    with transaction(connection):
+        create_checkpoint_table(connection)
+        connection.execute("DELETE FROM export_checkpoints WHERE name = ?", (name,))
+
+
+def export_table(
+    manager, table, path, file_format=None, start=None, end=None, checkpoint=None,
+    chunk_size=DEFAULT_CHUNK_SIZE, progress=None,
+):
+    """
+    Stream table ("inventory" or "sold_cards") into a CSV, JSON Lines or Parquet file, picked
+    from the extension unless file_format is given, in id order. start and end are Unix seconds
+    limiting the table's date column to start <= date < end. With a checkpoint name only rows
+    with a higher id than the last one that checkpoint exported are written, and the checkpoint
+    moves to the last id written. Ids are AUTOINCREMENT and never handed out twice, so every
+    card added since is caught. Cards brought back by undo keep their old id, so one deleted
+    while an export ran is not written again by the next; reset the checkpoint to export everything.
+
+    The rows come from a single SELECT, which reads one snapshot of the database (a single
+    PRAGMA data_version): writes committed by others while the export runs are not in the file
+    and are picked up by the next export under the same checkpoint. The file is written under a
+    temporary name and moved into place when complete, and the checkpoint only moves after
+    that, so an interrupted export is simply run again. progress(rows) is called after every chunk.
+    """
+    if table not in EXPORT_COLUMNS:
+        raise ValueError(f"Unknown table: {table}")
+    file_format = file_format or FORMATS.get(os.path.splitext(path)[1].lower())
+    if file_format not in FORMATS.values():
+        raise ValueError(f"Cannot tell the export format of {path}; use .csv, .jsonl or .parquet")
+    if file_format == "parquet" and pyarrow is None:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+
+    connection = manager.connection
+    columns = EXPORT_COLUMNS[table]
+    date_column = DATE_COLUMNS[table]
+    conditions, parameters = [], []
+    if start is not None:
+        conditions.append(f"{date_column} >= ?")
+        parameters.append(int(start))
+    if end is not None:
+        conditions.append(f"{date_column} < ?")
+        parameters.append(int(end))
+
+    previous = None
+    if checkpoint:
+        with transaction(connection):
+            create_checkpoint_table(connection)
+        previous = connection.execute("SELECT * FROM export_checkpoints WHERE name = ?", (checkpoint,)).fetchone()
+        if previous is not None:
+            if previous["table_name"] != table:
+                raise ValueError(f"Checkpoint {checkpoint!r} belongs to {previous['table_name']}, not {table}")
+            conditions.append("id > ?")
+            parameters.append(previous["last_id"])
+
+    report = ExportReport(table, path, checkpoint)
+    started = time.perf_counter()
+    cursor = connection.cursor()
+    # Plain tuples are much cheaper to build than sqlite3.Row objects
+    cursor.row_factory = None
+    cursor.execute(f"""
+        SELECT {", ".join(columns)} FROM {table}
+        WHERE {" AND ".join(conditions) or "1"}
+        ORDER BY id
+    """, parameters)
+
+    date_index, id_index = columns.index(date_column), columns.index("id")
+    last_row = None
+    temporary_path = f"{path}.part"
+    writer = WRITERS[file_format](temporary_path, columns)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            writer.write(rows)
+            report.rows += len(rows)
+            last_row = rows[-1]
+            if progress:
+                progress(report.rows)
+        writer.close()
+    except BaseException:
+        writer.close()
+        os.remove(temporary_path)
+        raise
+    finally:
+        cursor.close()
+    os.replace(temporary_path, path)
+
+    if checkpoint:
+        if last_row is not None:
+            last_date, last_id = last_row[date_index] or 0, last_row[id_index]
+        elif previous is not None:
+            last_date, last_id = previous["last_date"], previous["last_id"]
+        else:
+            last_date, last_id = 0, 0
+        with transaction(connection):
+            connection.execute("""
+                INSERT INTO export_checkpoints (name, table_name, last_date, last_id, exported_at, row_count)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    last_date = excluded.last_date,
+                    last_id = excluded.last_id,
+                    exported_at = excluded.exported_at,
+                    row_count = excluded.row_count
+            """, (checkpoint, table, last_date, last_id, int(time.time()), report.rows))
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+@functools.lru_cache(maxsize=4096)
+def format_timestamp(timestamp):
+    # Local time, as the app shows dates. Rows added or sold together share a timestamp, hence the cache.
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class CsvWriter:
+    def __init__(self, path, columns):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+        self.timestamps = [index for index, column in enumerate(columns) if column in TIMESTAMP_COLUMNS]
+
+    def write(self, rows):
+        if self.timestamps:
+            rows = [_format_row(row, self.timestamps) for row in rows]
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class JsonLinesWriter:
+    def __init__(self, path, columns):
+        self.file = open(path, "w", encoding="utf-8")
+        self.columns = columns
+        self.timestamps = [index for index, column in enumerate(columns) if column in TIMESTAMP_COLUMNS]
+
+    def write(self, rows):
+        self.file.write("".join(
+            json.dumps(dict(zip(self.columns, _format_row(row, self.timestamps))), ensure_ascii=False) + "\n"
+            for row in rows
+        ))
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Each chunk becomes one row group; dates are stored as UTC timestamps."""
+
+    def __init__(self, path, columns):
+        self.columns = columns
+        self.schema = pyarrow.schema([(column, _parquet_type(column)) for column in columns])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        arrays = [
+            pyarrow.array(values, type=field.type)
+            for values, field in zip(zip(*rows), self.schema)
+        ]
+        self.writer.write_table(pyarrow.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def _parquet_type(column):
+    if column in TIMESTAMP_COLUMNS:
+        return pyarrow.timestamp("s", tz="UTC")
+    if column in ("id", "sale_id"):
+        return pyarrow.int64()
+    if column in ("buy_price", "sell_price"):
+        return pyarrow.float64()
+    return pyarrow.string()
+
+
+def _format_row(row, timestamps):
+    row = list(row)
+    for index in timestamps:
+        row[index] = format_timestamp(row[index])
+    return row
+
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonLinesWriter, "parquet": ParquetWriter}
+
+
+def parse_day(value):
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export inventory or sales to CSV, JSON Lines or Parquet.")
+    parser.add_argument("table", nargs="?", choices=sorted(EXPORT_COLUMNS))
+    parser.add_argument("output", nargs="?", help="file to write; .csv, .jsonl or .parquet")
+    parser.add_argument("--db", help="database file (default: PKMN_DB_PATH or inventory.db)")
+    parser.add_argument("--from", dest="start", type=parse_day, help="first day to include, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", type=parse_day, help="last day to include, YYYY-MM-DD")
+    parser.add_argument("--checkpoint", help="only export rows added since the last export under this name")
+    parser.add_argument("--list-checkpoints", action="store_true")
+    parser.add_argument("--reset-checkpoint", metavar="NAME")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    manager = InventoryManager(config=DatabaseConfig(args.db))
+    try:
+        if args.list_checkpoints:
+            for checkpoint in get_checkpoints(manager.connection):
+                print(
+                    f"{checkpoint['name']}: {checkpoint['table_name']} up to id {checkpoint['last_id']} "
+                    f"({format_timestamp(checkpoint['last_date'])}), exported "
+                    f"{format_timestamp(checkpoint['exported_at'])}, {checkpoint['row_count']} rows"
+                )
+            return
+        if args.reset_checkpoint:
+            reset_checkpoint(manager.connection, args.reset_checkpoint)
+            return
+        if not args.table or not args.output:
+            parser.error("table and output are required")
+        # Days are local, and --to includes the whole of its day
+        start = int(args.start.timestamp()) if args.start else None
+        end = int((args.end + timedelta(days=1)).timestamp()) if args.end else None
+        report = export_table(
+            manager, args.table, args.output, start=start, end=end, checkpoint=args.checkpoint,
+            chunk_size=args.chunk_size,
+        )
+        print(report.summary())
+    finally:
+        manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import csv
+import json
+import os
+import sqlite3
+import time
+
+REQUIRED_FIELDS = ("name", "condition", "card_number", "buy_price")
+
+# Rows inserted per transaction; large enough to amortize commits, small enough to keep errors local
+DEFAULT_CHUNK_SIZE = 500
+
+
+class ImportReport:
+    """Outcome of a bulk import: imported card ids, per-row errors and throughput."""
+
+    def __init__(self, path):
+        self.path = path
+        self.card_ids = []
+        self.errors = []  # (row number, message)
+        self.rows_read = 0
+        self.seconds = 0.0
+
+    @property
+    def imported(self):
+        return len(self.card_ids)
+
+    @property
+    def rows_per_second(self):
+        return self.rows_read / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        lines = [
+            f"Imported {self.imported} of {self.rows_read} rows from {os.path.basename(self.path)} "
+            f"in {self.seconds:.1f}s ({self.rows_per_second:.0f} rows/s)."
+        ]
+        if self.errors:
+            lines.append(f"{len(self.errors)} rows were skipped:")
+            lines.extend(f"  row {row_number}: {message}" for row_number, message in self.errors[:10])
+            if len(self.errors) > 10:
+                lines.append(f"  ... and {len(self.errors) - 10} more")
+        return "\n".join(lines)
+
+
+def read_rows(path):
+    """
+    Yield (row number, dict) pairs from a CSV file, a JSON Lines file or a JSON array.
+    CSV and JSON Lines are streamed row by row; a JSON array has to be parsed as a whole.
+    Header names are matched loosely, so "Card Number" and "card_number" are the same field.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        with open(path, newline="", encoding="utf-8-sig") as file:
+            for row_number, row in enumerate(csv.DictReader(file), start=2):  # Row 1 is the header
+                yield row_number, normalize_keys(row)
+        return
+
+    with open(path, encoding="utf-8") as file:
+        first_char = file.read(1)
+        while first_char.isspace():
+            first_char = file.read(1)
+        file.seek(0)
+        if first_char == "[":
+            for row_number, row in enumerate(json.load(file), start=1):
+                yield row_number, normalize_keys(row) if isinstance(row, dict) else row
+            return
+        for row_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as error:
+                yield row_number, error
+                continue
+            yield row_number, normalize_keys(row) if isinstance(row, dict) else row
+
+
+def normalize_keys(row):
+    return {str(key).strip().lower().replace(" ", "_"): value for key, value in row.items() if key is not None}
+
+
+def validate_row(row):
+    """Return a (name, condition, card_number, buy_price) tuple or raise ValueError."""
+    if not isinstance(row, dict):
+        raise ValueError(f"expected an object with {', '.join(REQUIRED_FIELDS)}")
+    values = []
+    for field in REQUIRED_FIELDS:
+        value = row.get(field)
+        value = "" if value is None else str(value).strip()
+        if not value:
+            raise ValueError(f"missing {field}")
+        values.append(value)
+    try:
+        values[3] = float(values[3])
+    except ValueError:
+        raise ValueError(f"buy_price {values[3]!r} is not a number")
+    return tuple(values)
+
+
+def import_cards(manager, path, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Stream cards from path into the inventory in chunked transactions.
+    Invalid rows are reported in the returned ImportReport instead of aborting the file.
+    Only barcode numbers are stored; label images render when they are first printed.
+    progress(rows_read, imported) is called after every chunk.
+    """
+    report = ImportReport(path)
+    start = time.perf_counter()
+    chunk = []
+    for row_number, row in read_rows(path):
+        report.rows_read += 1
+        try:
+            if isinstance(row, Exception):
+                raise ValueError(str(row))
+            chunk.append((row_number, validate_row(row)))
+        except ValueError as error:
+            report.errors.append((row_number, str(error)))
+        if len(chunk) >= chunk_size:
+            _insert_chunk(manager, chunk, report)
+            chunk = []
+            if progress:
+                progress(report.rows_read, report.imported)
+    if chunk:
+        _insert_chunk(manager, chunk, report)
+    report.seconds = time.perf_counter() - start
+    if progress:
+        progress(report.rows_read, report.imported)
+    return report
+
+
+def _insert_chunk(manager, chunk, report):
+    try:
+        report.card_ids.extend(manager.add_cards([card for _, card in chunk]))
+    except sqlite3.Error:
+        # The chunk was rolled back; insert its rows one by one so only the bad rows are lost
+        for row_number, card in chunk:
+            try:
+                report.card_ids.extend(manager.add_cards([card]))
+            except sqlite3.Error as error:
+                report.errors.append((row_number, str(error)))
+
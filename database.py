@@ -0,0 +1,97 @@
+import itertools
+import os
+import sqlite3
+from contextlib import contextmanager
+
+import instrumentation
+
+DEFAULT_DB_PATH = "inventory.db"
+
+_savepoint_ids = itertools.count(1)
+
+
+class DatabaseConfig:
+    """
+    Where the inventory database lives and how connections to it are tuned.
+    The path defaults to the PKMN_DB_PATH environment variable, then to inventory.db.
+    """
+
+    def __init__(
+        self,
+        path=None,
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        cache_size_kib=32 * 1024,
+        mmap_size=256 * 1024 * 1024,
+        temp_store="MEMORY",
+        busy_timeout=5.0,
+        cached_statements=256,
+        check_same_thread=True,
+    ):
+        self.path = path or os.environ.get("PKMN_DB_PATH") or DEFAULT_DB_PATH
+        # WAL lets readers and the writer work at the same time, and NORMAL sync is durable
+        # across application crashes in WAL mode while skipping an fsync on every commit
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.temp_store = temp_store
+        # Seconds to wait for another connection's write lock before "database is locked"
+        self.busy_timeout = busy_timeout
+        # Prepared statements kept per connection, so repeated queries skip parsing
+        self.cached_statements = cached_statements
+        # Pooled connections are handed between threads, one thread at a time
+        self.check_same_thread = check_same_thread
+
+
+def connect(config=None):
+    """
+    Open a tuned connection. It runs in autocommit mode: plain reads never open a transaction,
+    so they hold no locks between statements. Writes go through transaction().
+    """
+    config = config or DatabaseConfig()
+    connection = sqlite3.connect(
+        config.path,
+        timeout=config.busy_timeout,
+        isolation_level=None,
+        cached_statements=config.cached_statements,
+        check_same_thread=config.check_same_thread,
+        # Times every statement for the slow query log when instrumentation is on
+        factory=instrumentation.TimedConnection if instrumentation.is_enabled() else sqlite3.Connection,
+    )
+    connection.row_factory = sqlite3.Row  # Return rows as dictionaries
+    connection.execute(f"PRAGMA journal_mode = {config.journal_mode}")
+    connection.execute(f"PRAGMA synchronous = {config.synchronous}")
+    # A negative cache_size is in KiB rather than pages
+    connection.execute(f"PRAGMA cache_size = -{int(config.cache_size_kib)}")
+    connection.execute(f"PRAGMA mmap_size = {int(config.mmap_size)}")
+    connection.execute(f"PRAGMA temp_store = {config.temp_store}")
+    return connection
+
+
+@contextmanager
+def transaction(connection):
+    """
+    Write transaction on a connection from connect(). BEGIN IMMEDIATE takes the write lock up
+    front, so a transaction never fails halfway when another connection is writing; it waits
+    for busy_timeout instead. Nested calls become savepoints that roll back on their own.
+    """
+    if connection.in_transaction:
+        savepoint = f"sp_{next(_savepoint_ids)}"
+        connection.execute(f"SAVEPOINT {savepoint}")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute(f"ROLLBACK TO {savepoint}")
+            connection.execute(f"RELEASE {savepoint}")
+            raise
+        connection.execute(f"RELEASE {savepoint}")
+        return
+
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield connection
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
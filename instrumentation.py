@@ -0,0 +1,225 @@
+import functools
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# Instrumentation is off unless PKMN_PROFILE is set or enable() is called before the managers and
+# the app are created. When it is off nothing is wrapped, so the only cost is one check when a
+# manager, connection or window is created.
+DEFAULT_SLOW_QUERY_MS = 50.0
+# Timings kept per operation for the percentiles; older calls only count towards the totals
+MAX_SAMPLES = 2000
+MAX_SLOW_QUERIES = 100
+
+logger = logging.getLogger("pkmn.slow_queries")
+
+_enabled = bool(os.environ.get("PKMN_PROFILE"))
+_slow_query_seconds = float(os.environ.get("PKMN_SLOW_QUERY_MS") or DEFAULT_SLOW_QUERY_MS) / 1000
+_lock = threading.Lock()
+_operations = {}
+_slow_queries = deque(maxlen=MAX_SLOW_QUERIES)
+
+
+class OperationStats:
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=MAX_SAMPLES)
+
+
+def enable(slow_query_ms=None):
+    """Turn instrumentation on for managers, connections and windows created from now on."""
+    global _enabled, _slow_query_seconds
+    _enabled = True
+    if slow_query_ms is not None:
+        _slow_query_seconds = slow_query_ms / 1000
+
+
+def is_enabled():
+    return _enabled
+
+
+def record(name, seconds):
+    with _lock:
+        stats = _operations.get(name)
+        if stats is None:
+            stats = _operations[name] = OperationStats()
+        stats.calls += 1
+        stats.total += seconds
+        stats.max = max(stats.max, seconds)
+        stats.samples.append(seconds)
+
+
+def timed(name, function):
+    """Wrap function so every call is recorded under name."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            record(name, time.perf_counter() - start)
+    return wrapper
+
+
+def instrument(obj, prefix, names=None, exclude=()):
+    """
+    Time the public methods of one object, or only those in names, by shadowing them with timed
+    wrappers on the instance. The class is left alone, so other instances cost nothing.
+    """
+    if names is None:
+        names = [
+            name for name in dir(type(obj))
+            if not name.startswith("_") and callable(getattr(type(obj), name))
+        ]
+    for name in names:
+        if name not in exclude:
+            setattr(obj, name, timed(f"{prefix}.{name}", getattr(obj, name)))
+    return obj
+
+
+def record_query(connection, sql, parameters, seconds):
+    """Time one statement, and log it with its query plan if it took longer than the threshold."""
+    statement = " ".join(sql.split())
+    # Numbers are masked so savepoint names and inlined sizes do not make every statement unique
+    record(f"sql: {re.sub(r'[0-9]+', '?', statement)[:80]}", seconds)
+    if seconds < _slow_query_seconds:
+        return
+    try:
+        # The base class's execute, so explaining a statement is not itself timed
+        plan = [
+            row[-1] for row in
+            sqlite3.Connection.execute(connection, f"EXPLAIN QUERY PLAN {sql}", parameters or ()).fetchall()
+        ]
+    except (sqlite3.Error, ValueError):
+        # Statements such as BEGIN or PRAGMA have no plan
+        plan = []
+    entry = {"time": time.time(), "ms": seconds * 1000, "sql": statement, "plan": plan}
+    with _lock:
+        _slow_queries.append(entry)
+    logger.warning("Slow query (%.1f ms): %s\n    %s", entry["ms"], statement, "\n    ".join(plan))
+
+
+def summary():
+    """[{name, calls, total_ms, p50_ms, p95_ms, max_ms}] for every timed operation, slowest in total first."""
+    with _lock:
+        operations = [(name, stats.calls, stats.total, stats.max, sorted(stats.samples)) for name, stats in _operations.items()]
+    rows = [
+        {
+            "name": name,
+            "calls": calls,
+            "total_ms": total * 1000,
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p95_ms": percentile(samples, 95) * 1000,
+            "max_ms": maximum * 1000,
+        }
+        for name, calls, total, maximum, samples in operations
+    ]
+    rows.sort(key=lambda row: row["total_ms"], reverse=True)
+    return rows
+
+
+def slow_queries():
+    """The most recent slow statements, newest last."""
+    with _lock:
+        return list(_slow_queries)
+
+
+def reset():
+    with _lock:
+        _operations.clear()
+        _slow_queries.clear()
+
+
+def percentile(ordered, point):
+    # Nearest rank, which is always one of the measured timings
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(point / 100 * len(ordered)) - 1)]
+
+
+class TimedCursor(sqlite3.Cursor):
+    """
+    Cursor that times each statement from execute until its rows are read, so a SELECT is
+    charged for the rows it steps through and not just for preparing it.
+    """
+
+    sql = None
+    parameters = None
+    seconds = 0.0
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        self.sql, self.parameters = sql, parameters
+        self._timed(super().execute, sql, parameters)
+        if self.description is None:
+            # No result rows to read, e.g. INSERT or UPDATE
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        self.sql = sql
+        self._timed(super().executemany, sql, seq_of_parameters)
+        self._finish()
+        return self
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        # Statements read with fetchone are lookups of a single row
+        self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed(super().fetchmany, size)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            return self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def _finish(self):
+        if self.sql is not None:
+            record_query(self.connection, self.sql, self.parameters, self.seconds)
+        self.sql, self.parameters, self.seconds = None, None, 0.0
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose statements all run on TimedCursor; database.connect uses it when enabled."""
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or TimedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
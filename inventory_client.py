@@ -0,0 +1,185 @@
+import http.client
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode, urlparse
+
+import instrumentation
+from inventory_server import READ_METHODS, WRITE_METHODS
+from label_cache import LabelCache
+
+MAX_CACHED_RESULTS = 256
+CHANGE_POLL_SECONDS = 25
+RECONNECT_DELAY_SECONDS = 2.0
+
+
+class RemoteError(RuntimeError):
+    """An error raised by the inventory server that has no local equivalent."""
+
+
+class RemoteInventoryManager:
+    """
+    Stands in for InventoryManager on a station that shares its inventory through an
+    InventoryServer. It offers the same read and write methods, so the UI and the import and
+    label sheet helpers work unchanged. Read results are cached locally and dropped as soon
+    as the server's change feed reports a write to their table, so repeated reads never poll.
+    """
+
+    def __init__(self, url, label_cache=None, timeout=10.0, station=None):
+        parsed = urlparse(url)
+        # The server journals this station's writes under this name, so undo only reverts its own
+        self.station = station or os.environ.get("PKMN_STATION") or socket.gethostname()
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.timeout = timeout
+        self.local = threading.local()
+        self.change_listeners = []
+        self.table_versions = {"inventory": 0, "sold_cards": 0}
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+        # Labels are rendered on the station that prints them
+        self.label_cache = label_cache or LabelCache()
+
+        self.closed = False
+        self.server_id = None
+        self.sequence = self._fetch_changes(0, timeout=0)["sequence"]
+        self.change_thread = threading.Thread(target=self._follow_changes, name="InventoryChanges", daemon=True)
+        self.change_thread.start()
+        if instrumentation.is_enabled():
+            instrumentation.instrument(self, "remote", names=[*READ_METHODS, *WRITE_METHODS, "get_label_path"])
+
+    def __getattr__(self, name):
+        if name in READ_METHODS:
+            return lambda *args, **kwargs: self._read(name, args, kwargs)
+        if name in WRITE_METHODS:
+            return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+        raise AttributeError(name)
+
+    def add_change_listener(self, listener):
+        """Register listener(table, action, ids); it runs on the change feed thread."""
+        self.change_listeners.append(listener)
+
+    def remove_change_listener(self, listener):
+        if listener in self.change_listeners:
+            self.change_listeners.remove(listener)
+
+    def get_label_path(self, card_id):
+        """Return the label image for an inventory card, rendering it on first use."""
+        card = self.get_card_by_id(card_id)
+        if card is None:
+            return None
+        return self.label_cache.get_label(card["barcode"], card["name"], card["condition"])
+
+    def get_next_undo(self):
+        # The undo history is per station and changes with the station's own writes before the
+        # change feed reports them, so it is never served from the cache
+        return self.call("get_next_undo")
+
+    def get_next_redo(self):
+        return self.call("get_next_redo")
+
+    def get_undo_history(self, limit=20):
+        return self.call("get_undo_history", limit)
+
+    def call(self, method, *args, **kwargs):
+        body = json.dumps({"method": method, "args": args, "kwargs": kwargs, "station": self.station})
+        response = self._request("POST", "/call", body, self.timeout, retry=method in READ_METHODS)
+        if "error" in response:
+            error = response["error"]
+            exception_type = getattr(sqlite3, error["type"], None)
+            # Keep sqlite3 errors as themselves, e.g. so bulk imports can fall back row by row
+            if isinstance(exception_type, type) and issubclass(exception_type, sqlite3.Error):
+                raise exception_type(error["message"])
+            raise RemoteError(f"{error['type']}: {error['message']}")
+        return response["result"]
+
+    def close(self):
+        self.closed = True
+        connection = getattr(self.local, "connection", None)
+        if connection is not None:
+            connection.close()
+
+    def _read(self, method, args, kwargs):
+        tables = READ_METHODS[method]
+        if isinstance(tables, str):
+            tables = (tables,)
+        key = json.dumps([method, args, kwargs], sort_keys=True)
+        with self.cache_lock:
+            version = tuple(self.table_versions[table] for table in tables)
+            entry = self.cache.get(key)
+            if entry is not None and entry[0] == version:
+                self.cache.move_to_end(key)
+                return self._copy(entry[1])
+        result = self.call(method, *args, **kwargs)
+        with self.cache_lock:
+            # A change that arrived while the call was in flight may not be in the result
+            if version == tuple(self.table_versions[table] for table in tables):
+                self.cache[key] = (version, result)
+                self.cache.move_to_end(key)
+                while len(self.cache) > MAX_CACHED_RESULTS:
+                    self.cache.popitem(last=False)
+        return self._copy(result)
+
+    @staticmethod
+    def _copy(result):
+        # Callers may change the rows they get, which must not change the cached ones
+        if isinstance(result, list):
+            return [dict(row) if isinstance(row, dict) else row for row in result]
+        if isinstance(result, dict):
+            return dict(result)
+        return result
+
+    def _follow_changes(self):
+        while not self.closed:
+            try:
+                response = self._fetch_changes(self.sequence, CHANGE_POLL_SECONDS)
+            except (OSError, http.client.HTTPException, ValueError):
+                time.sleep(RECONNECT_DELAY_SECONDS)
+                continue
+            self.sequence = response["sequence"]
+            if response["changes"] is None:
+                # Too far behind, or the server restarted: everything cached may be stale
+                for table in self.table_versions:
+                    self._apply_change(table, "reload", [])
+                continue
+            for change in response["changes"]:
+                self._apply_change(change["table"], change["action"], change["ids"])
+
+    def _fetch_changes(self, since, timeout):
+        query = {"since": since, "timeout": timeout}
+        if self.server_id is not None:
+            query["server"] = self.server_id
+        response = self._request("GET", "/changes?" + urlencode(query), None, timeout + self.timeout, retry=True)
+        self.server_id = response["server"]
+        return response
+
+    def _apply_change(self, table, action, ids):
+        with self.cache_lock:
+            self.table_versions[table] += 1
+        for listener in list(self.change_listeners):
+            listener(table, action, ids)
+
+    def _request(self, verb, path, body, timeout, retry=False):
+        # One keep-alive connection per thread; http.client connections are not thread safe
+        connection = getattr(self.local, "connection", None)
+        reused = connection is not None
+        if not reused:
+            connection = self.local.connection = http.client.HTTPConnection(self.host, self.port)
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        try:
+            connection.request(verb, path, body, {"Content-Type": "application/json"})
+            return json.loads(connection.getresponse().read())
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self.local.connection = None
+            if reused and retry:
+                # The kept-alive connection may have gone away, e.g. after a server restart.
+                # Only reads are retried, since a write may already have been applied
+                return self._request(verb, path, body, timeout)
+            raise
@@ -1,171 +1,709 @@
 import sqlite3
-from datetime import datetime
-from barcode_generator import generate_barcode
+import time
+from contextlib import contextmanager
+import analytics
+import instrumentation
+import journal
+import migrations
+from barcode_generator import calculate_upc_check_digit
+from database import DatabaseConfig, connect, transaction
+from label_cache import LabelCache
+from reporting import SalesReport
+from search_cache import SearchCache
+
+# Columns covered by the full-text search index, in the order the FTS tables declare them
+SEARCH_COLUMNS = ("name", "condition", "card_number", "barcode")
+
+# Rows fetched per keyset page by the windowed list views
+PAGE_SIZE = 100
+
+# SQLite's default limit on bound parameters is 999 on older builds, so id lists are chunked
+IN_CLAUSE_CHUNK = 500
+
+# Store barcodes use UPC number system 2, which is reserved for in-store labels, followed by a
+# 10-digit sequence number and the check digit
+BARCODE_PREFIX = "2"
+# Sequence numbers must fit in those 10 digits
+BARCODE_SEQUENCE_LIMIT = 10 ** 10
+
+# The trigram tokenizer cannot match strings shorter than this, so shorter queries fall back to LIKE
+FTS_MIN_QUERY_LENGTH = 3
+
+
+def count_noun(count, noun):
+    """'1 card', '3 cards': a count with its noun pluralized to match, for undo descriptions."""
+    return f"{count} {noun}" if count == 1 else f"{count} {noun}s"
+
+
+def allocate_sale_price(total_price, weights):
+    """
+    Split total_price into one price per weight, in proportion to the weights and rounded to
+    cents so the parts add up to the total exactly. Without any positive weight the split is even.
+    Raises ValueError for a negative total.
+    """
+    if total_price is None or total_price < 0:
+        raise ValueError(f"Sale price must be zero or more, not {total_price}")
+    weights = [max(weight or 0, 0) for weight in weights]
+    if not weights:
+        # An empty cart has nothing to split the price over
+        return []
+    if sum(weights) <= 0:
+        weights = [1] * len(weights)
+    total_cents = round(total_price * 100)
+    weight_sum = sum(weights)
+    shares = [total_cents * weight / weight_sum for weight in weights]
+    cents = [int(share) for share in shares]
+    # Hand the cents lost to rounding down to the largest remainders
+    by_remainder = sorted(range(len(shares)), key=lambda index: shares[index] - cents[index], reverse=True)
+    for index in by_remainder[:total_cents - sum(cents)]:
+        cents[index] += 1
+    return [cent / 100 for cent in cents]
+
 
 class InventoryManager:
-    def __init__(self):
-        self.connection = sqlite3.connect("inventory.db")
-        self.connection.row_factory = sqlite3.Row  # Return rows as dictionaries
+    def __init__(self, db_path=None, label_cache=None, config=None):
+        self.config = config or DatabaseConfig(db_path)
+        self.connection = connect(self.config)
+        self.fts_enabled = False
+        self.change_listeners = []
+        # Changes made inside an open transaction, announced once it commits
+        self.pending_changes = []
+        # Set while an action is being journaled, so nested calls join it instead of starting their own
+        self.recording_action = False
+        # Whose actions this manager journals and undoes; an inventory server sets it per call
+        self.station = ""
+        # Bumped on every write so cached search results for the table go stale
+        self.table_versions = {"inventory": 0, "sold_cards": 0}
+        self.search_cache = SearchCache(SEARCH_COLUMNS)
+        # Label images are rendered on demand, not when a card is added
+        self.label_cache = label_cache or LabelCache()
+        # Column arrays of the sales history, reloaded after sold_cards changes
+        self.sales_report = SalesReport(self)
         self.create_tables()
+        if instrumentation.is_enabled():
+            instrumentation.instrument(
+                self, "manager", exclude=("transaction", "add_change_listener", "remove_change_listener")
+            )
+
+    def close(self):
+        self.connection.close()
+
+    def add_change_listener(self, listener):
+        """
+        Register listener(table, action, ids), called after a mutation commits.
+        action is "insert", "update" or "delete" and ids are the affected row ids of table.
+        """
+        self.change_listeners.append(listener)
+
+    def remove_change_listener(self, listener):
+        self.change_listeners.remove(listener)
+
+    def _notify(self, table, action, ids):
+        ids = [int(row_id) for row_id in ids]
+        if not ids:
+            return
+        if self.connection.in_transaction:
+            self.pending_changes.append((table, action, ids))
+            return
+        self.table_versions[table] += 1
+        for listener in list(self.change_listeners):
+            listener(table, action, ids)
+
+    @contextmanager
+    def transaction(self, action=None):
+        """
+        Write transaction; reads outside of one run in autocommit mode and take no write locks.
+        Nested calls become savepoints, and changes are only announced once the outermost commits.
+        With an action description the changes are journaled as one step that undo can revert.
+        """
+        outermost = not self.connection.in_transaction
+        mark = len(self.pending_changes)
+        recording = action is not None and not self.recording_action
+        try:
+            with transaction(self.connection):
+                if recording:
+                    self.recording_action = True
+                    action_id = journal.begin_action(self.connection, action, self.station)
+                yield self.connection
+                if recording:
+                    journal.end_action(self.connection, action_id)
+        except BaseException:
+            del self.pending_changes[mark:]
+            raise
+        finally:
+            if recording:
+                self.recording_action = False
+        if outermost:
+            changes, self.pending_changes = self.pending_changes, []
+            for change in changes:
+                self._notify(*change)
 
     def create_tables(self):
-        with self.connection:
+        # A new database gets the newest schema directly instead of being upgraded from the oldest
+        fresh = not self.connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'inventory'").fetchone()
+        with self.transaction():
             # Create tables
             self.connection.execute("""
                 CREATE TABLE IF NOT EXISTS inventory (
-                    id INTEGER PRIMARY KEY,
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
                     name TEXT,
                     condition TEXT,
                     card_number TEXT,
                     buy_price REAL,
                     barcode TEXT,
-                    date_added TEXT
+                    date_added INTEGER
                 )
             """)
             self.connection.execute("""
                 CREATE TABLE IF NOT EXISTS sold_cards (
-                    id INTEGER PRIMARY KEY,
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
                     name TEXT,
                     condition TEXT,
                     card_number TEXT,
                     barcode TEXT,
-                    sold_date TEXT,
+                    sold_date INTEGER,
                     buy_price REAL,
                     sell_price REAL
                 )
             """)
+        self.create_search_index()
+        self.create_barcode_indexes()
+        self.create_barcode_sequence()
+        self.create_sales_table()
+        # Versioned upgrades on top of the tables above, tracked in PRAGMA user_version
+        migrations.migrate(self.connection, fresh=fresh)
+        self.create_analytics_tables()
+        self.create_journal_tables()
 
-    def add_card(self, name, condition, card_number, buy_price):
-        barcode, _ = generate_barcode(name, condition)  # Extract barcode number from tuple
-        date_added = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with self.connection:
+    def create_search_index(self):
+        """
+        Create trigram FTS5 indexes over the searchable columns of both tables.
+        The indexes use the tables as external content and are kept in sync by triggers,
+        so they only store the tokens. Older SQLite builds without FTS5 keep using LIKE scans.
+        """
+        columns = ", ".join(SEARCH_COLUMNS)
+        new_columns = ", ".join(f"new.{column}" for column in SEARCH_COLUMNS)
+        old_columns = ", ".join(f"old.{column}" for column in SEARCH_COLUMNS)
+        try:
+            with self.transaction():
+                for table in ("inventory", "sold_cards"):
+                    exists = self.connection.execute(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (f"{table}_fts",)
+                    ).fetchone()
+                    self.connection.execute(f"""
+                        CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+                            {columns},
+                            content='{table}', content_rowid='id', tokenize='trigram'
+                        )
+                    """)
+                    self.connection.execute(f"""
+                        CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+                            INSERT INTO {table}_fts(rowid, {columns}) VALUES (new.id, {new_columns});
+                        END
+                    """)
+                    self.connection.execute(f"""
+                        CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+                            INSERT INTO {table}_fts({table}_fts, rowid, {columns})
+                            VALUES ('delete', old.id, {old_columns});
+                        END
+                    """)
+                    self.connection.execute(f"""
+                        CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF {columns} ON {table} BEGIN
+                            INSERT INTO {table}_fts({table}_fts, rowid, {columns})
+                            VALUES ('delete', old.id, {old_columns});
+                            INSERT INTO {table}_fts(rowid, {columns}) VALUES (new.id, {new_columns});
+                        END
+                    """)
+                    if not exists:
+                        # Index the rows that were added before the search index existed
+                        self.connection.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+            self.fts_enabled = True
+        except sqlite3.OperationalError:
+            # SQLite was built without FTS5 or without the trigram tokenizer
+            self.fts_enabled = False
+
+    def create_barcode_indexes(self):
+        """
+        Index barcode so a scan resolves with one B-tree lookup. This also upgrades existing
+        inventory.db files. Databases that already hold duplicate random barcodes cannot take
+        the unique index, so they get a plain index and lookups stay indexed.
+        """
+        for table in ("inventory", "sold_cards"):
+            existing = self.connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name IN (?, ?)",
+                (f"idx_{table}_barcode", f"idx_{table}_barcode_nonunique")
+            ).fetchone()
+            if existing:
+                continue
+            try:
+                with self.transaction():
+                    self.connection.execute(f"CREATE UNIQUE INDEX idx_{table}_barcode ON {table}(barcode)")
+            except sqlite3.IntegrityError:
+                with self.transaction():
+                    self.connection.execute(f"CREATE INDEX idx_{table}_barcode_nonunique ON {table}(barcode)")
+
+    def create_barcode_sequence(self):
+        """
+        Single-row counter that barcode numbers are allocated from. It starts above every
+        number-system-2 barcode already stored, because older versions picked barcodes at
+        random, so a sequential number can never collide with an existing card.
+        """
+        with self.transaction():
             self.connection.execute("""
-                INSERT INTO inventory (name, condition, card_number, buy_price, barcode, date_added)
-                 VALUES (?, ?, ?, ?, ?, ?)
-            """, (name, condition, card_number, buy_price, barcode, date_added))  # Pass only the barcode number
+                CREATE TABLE IF NOT EXISTS barcode_sequence (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    next_value INTEGER NOT NULL
+                )
+            """)
+            if self.connection.execute("SELECT 1 FROM barcode_sequence").fetchone():
+                return
+            next_value = 0
+            for table in ("inventory", "sold_cards"):
+                # Fixed-length digit strings sort numerically, so the barcode index answers this directly
+                highest = self.connection.execute(
+                    f"SELECT MAX(barcode) FROM {table} WHERE barcode >= ? AND barcode < ?",
+                    (BARCODE_PREFIX, str(int(BARCODE_PREFIX) + 1))
+                ).fetchone()[0]
+                if highest and highest[1:11].isdigit():
+                    next_value = max(next_value, int(highest[1:11]) + 1)
+            self.connection.execute("INSERT INTO barcode_sequence (id, next_value) VALUES (1, ?)", (next_value,))
 
-        # Check if the card name contains "Blastoise"
-        if "Blastoise" in name:
-            self.prank()
+    def create_sales_table(self):
+        """
+        One row per checkout. Sold cards point at their sale, so a bundle sold for one price
+        can be looked up as a whole, and keep the date they were added for sell-through times.
+        Cards sold before these columns existed keep NULLs in them.
+        """
+        with self.transaction():
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS sales (
+                    id INTEGER PRIMARY KEY,
+                    sold_date INTEGER,
+                    total_price REAL,
+                    card_count INTEGER
+                )
+            """)
+            columns = [row["name"] for row in self.connection.execute("PRAGMA table_info(sold_cards)")]
+            if "sale_id" not in columns:
+                self.connection.execute("ALTER TABLE sold_cards ADD COLUMN sale_id INTEGER REFERENCES sales(id)")
+            if "date_added" not in columns:
+                self.connection.execute("ALTER TABLE sold_cards ADD COLUMN date_added INTEGER")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS idx_sold_cards_sale ON sold_cards(sale_id)")
 
-    def prank(self):
-        import tkinter as tk
-        from PIL import Image, ImageTk
-        from resource_path import resource_path
+    def create_analytics_tables(self):
+        with self.transaction():
+            analytics.create_analytics_tables(self.connection)
 
-        # Create a window to display the PNG
-        prank_window = tk.Toplevel()
-        prank_window.title("Surprise!")
-        prank_window.geometry("1920x1080")  # You can adjust size as needed
-        prank_window.overrideredirect(True)  # Remove window decorations
+    def create_journal_tables(self):
+        with self.transaction():
+            journal.create_journal_tables(self.connection)
+            # Trim the undo history left by earlier sessions
+            journal.compact(self.connection)
 
-        # Use resource_path to find the image wherever the app is run
-        img_path = resource_path("Zach.jpg")  # or "Zach.jpg" if you keep JPG
+    def get_dashboard(self, periods=12, margins=20):
+        """Inventory value, sales totals, sales per day/week/month and margins per card."""
+        return analytics.get_dashboard(self.connection, periods, margins)
 
-        img = Image.open(img_path)
-        img = img.resize((1920, 1080))  # Resize the image to fit the window
+    def get_sales_statistics(self, window=7, days=30, bins=20):
+        """Sale price and profit percentiles, a moving average of daily profit and a price histogram."""
+        return self.sales_report.statistics(window, days, bins)
 
-        img_tk = ImageTk.PhotoImage(img)
+    def allocate_barcodes(self, count):
+        """Reserve `count` unique barcode numbers in their own transaction."""
+        with self.transaction():
+            return self._allocate_barcodes(count)
 
-        label = tk.Label(prank_window, image=img_tk)
-        label.pack(expand=True, fill="both")
+    def _allocate_barcodes(self, count):
+        # Must run inside a write transaction. Bumping the counter first takes the write lock, so no
+        # other connection can hand out the same block before this transaction commits.
+        self.connection.execute("UPDATE barcode_sequence SET next_value = next_value + ? WHERE id = 1", (count,))
+        end = self.connection.execute("SELECT next_value FROM barcode_sequence WHERE id = 1").fetchone()[0]
+        if end > BARCODE_SEQUENCE_LIMIT:
+            # Raising rolls the counter back with the rest of the transaction
+            raise ValueError(
+                f"Out of barcode numbers: {max(0, BARCODE_SEQUENCE_LIMIT - (end - count))} left, {count} needed"
+            )
+        barcodes = []
+        for value in range(end - count, end):
+            body = f"{BARCODE_PREFIX}{value:010d}"
+            barcodes.append(body + str(calculate_upc_check_digit(body)))
+        return barcodes
 
-        # Automatically close the window after 0.5 seconds
-        prank_window.after(500, prank_window.destroy)  # 500 ms = 0.5 seconds
+    def add_card(self, name, condition, card_number, buy_price):
+        date_added = int(time.time())
+        with self.transaction(action=f"add {name}"):
+            barcode = self._allocate_barcodes(1)[0]
+            card_id = self.connection.execute("""
+                INSERT INTO inventory (name, condition, card_number, buy_price, barcode, date_added)
+                 VALUES (?, ?, ?, ?, ?, ?)
+            """, (name, condition, card_number, buy_price, barcode, date_added)).lastrowid
+        self._notify("inventory", "insert", [card_id])
+        return card_id
+
+    def add_cards(self, cards):
+        """
+        Insert many (name, condition, card_number, buy_price) cards in one transaction and return
+        their ids. Like add_card, only barcode numbers are assigned; labels render on demand.
+        """
+        cards = list(cards)
+        date_added = int(time.time())
+        with self.transaction(action=f"add {count_noun(len(cards), 'card')}"):
+            barcodes = self._allocate_barcodes(len(cards))
+            rows = [
+                (name, condition, card_number, buy_price, barcode, date_added)
+                for (name, condition, card_number, buy_price), barcode in zip(cards, barcodes)
+            ]
+            last_id = self.connection.execute("SELECT COALESCE(MAX(id), 0) FROM inventory").fetchone()[0]
+            self.connection.executemany("""
+                INSERT INTO inventory (name, condition, card_number, buy_price, barcode, date_added)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+            # New rows get ids above the previous maximum, so this is a range scan on the primary key
+            card_ids = [row[0] for row in self.connection.execute(
+                "SELECT id FROM inventory WHERE id > ? ORDER BY id", (last_id,)
+            )]
+        self._notify("inventory", "insert", card_ids)
+        return card_ids
 
-        # Keep a reference to the image to prevent garbage collection
-        prank_window.img_tk = img_tk
+    def get_label_path(self, card_id):
+        """Return the label image for an inventory card, rendering it on first use."""
+        card = self.get_card_by_id(card_id)
+        if card is None:
+            return None
+        return self.label_cache.get_label(card["barcode"], card["name"], card["condition"])
 
     def get_inventory(self):
-        with self.connection:
-            return self.connection.execute("SELECT * FROM inventory").fetchall()
+        return self.connection.execute("SELECT * FROM inventory").fetchall()
 
     def get_inventory_latest_first(self):
-        with self.connection:
-            return self.connection.execute("SELECT * FROM inventory ORDER BY id DESC").fetchall()
+        return self.connection.execute("SELECT * FROM inventory ORDER BY id DESC").fetchall()
 
     def get_sold_cards(self):
-        with self.connection:
-            return self.connection.execute("SELECT * FROM sold_cards").fetchall()
+        return self.connection.execute("SELECT * FROM sold_cards").fetchall()
+
+    def get_inventory_page(self, anchor_id=None, limit=PAGE_SIZE, latest_first=False, backwards=False):
+        return self._get_page("inventory", anchor_id, limit, latest_first, backwards)
+
+    def get_sold_cards_page(self, anchor_id=None, limit=PAGE_SIZE, backwards=False):
+        return self._get_page("sold_cards", anchor_id, limit, False, backwards)
+
+    def _get_page(self, table, anchor_id, limit, descending, backwards):
+        """
+        Keyset pagination: fetch up to `limit` rows that come after `anchor_id` in display order,
+        or the rows just before it when `backwards` is set. Rows are always returned in display
+        order, and the primary key index means each page costs the same however deep it is.
+        """
+        # Walking backwards flips the comparison and sort, then the page is reversed back
+        forward_is_descending = descending != backwards
+        comparison = "<" if forward_is_descending else ">"
+        direction = "DESC" if forward_is_descending else "ASC"
+        if anchor_id is None:
+            rows = self.connection.execute(
+                f"SELECT * FROM {table} ORDER BY id {direction} LIMIT ?", (limit,)
+            ).fetchall()
+        else:
+            rows = self.connection.execute(
+                f"SELECT * FROM {table} WHERE id {comparison} ? ORDER BY id {direction} LIMIT ?",
+                (anchor_id, limit)
+            ).fetchall()
+        return rows[::-1] if backwards else rows
 
     def get_card_by_id(self, card_id):
-        with self.connection:
-            return self.connection.execute("SELECT * FROM inventory WHERE id = ?", (card_id,)).fetchone()
+        return self.connection.execute("SELECT * FROM inventory WHERE id = ?", (card_id,)).fetchone()
+
+    def get_cards_by_ids(self, card_ids):
+        return self._get_by_ids("inventory", card_ids)
+
+    def get_sold_cards_by_ids(self, card_ids):
+        return self._get_by_ids("sold_cards", card_ids)
+
+    def _get_by_ids(self, table, row_ids):
+        row_ids = list(row_ids)
+        rows = []
+        for start in range(0, len(row_ids), IN_CLAUSE_CHUNK):
+            chunk = row_ids[start:start + IN_CLAUSE_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            rows.extend(self.connection.execute(
+                f"SELECT * FROM {table} WHERE id IN ({placeholders}) ORDER BY id", chunk
+            ).fetchall())
+        return rows
+
+    def find_by_barcode(self, barcode):
+        return self.connection.execute(
+            "SELECT * FROM inventory WHERE barcode = ? LIMIT 1", (barcode,)
+        ).fetchone()
+
+    def find_sold_by_barcode(self, barcode):
+        return self.connection.execute(
+            "SELECT * FROM sold_cards WHERE barcode = ? LIMIT 1", (barcode,)
+        ).fetchone()
 
     def delete_inventory_item(self, card_id):
-        with self.connection:
+        with self.transaction(action=f"delete card {card_id}"):
             self.connection.execute("DELETE FROM inventory WHERE id = ?", (card_id,))
+        self._notify("inventory", "delete", [card_id])
 
     def delete_sold_item(self, card_id):
-        with self.connection:
+        with self.transaction(action=f"delete sold card {card_id}"):
             self.connection.execute("DELETE FROM sold_cards WHERE id = ?", (card_id,))
+        self._notify("sold_cards", "delete", [card_id])
+
+    def delete_inventory_items(self, card_ids):
+        """Delete many inventory cards with one statement and return the ids that existed."""
+        return self._delete_rows("inventory", card_ids)
+
+    def delete_sold_items(self, card_ids):
+        """Delete many sold cards with one statement and return the ids that existed."""
+        return self._delete_rows("sold_cards", card_ids)
+
+    def _delete_rows(self, table, row_ids):
+        row_ids = list(row_ids)
+        kind = "sold card" if table == "sold_cards" else "card"
+        with self.transaction(action=f"delete {count_noun(len(row_ids), kind)}"):
+            deleted_ids = self._select_rows(table, card_ids=row_ids)
+            self.connection.execute(f"DELETE FROM {table} WHERE id IN (SELECT id FROM selected_ids)")
+            self._notify(table, "delete", deleted_ids)
+        return deleted_ids
+
+    def set_buy_price(self, card_ids, buy_price):
+        """Give every listed inventory card the same buy price and return the updated ids."""
+        with self.transaction(action=f"set buy price to {buy_price}"):
+            updated_ids = self._select_rows("inventory", card_ids=card_ids)
+            self.connection.execute(
+                "UPDATE inventory SET buy_price = ? WHERE id IN (SELECT id FROM selected_ids)", (buy_price,)
+            )
+            self._notify("inventory", "update", updated_ids)
+        return updated_ids
+
+    def markdown_buy_prices(self, percent, card_ids=None, query=None):
+        """
+        Lower the buy price of the listed cards, or of every card matching a search query,
+        by percent and round to cents. Returns the updated ids. Raises ValueError unless
+        0 <= percent <= 100, since anything else would raise prices or make them negative.
+        """
+        if percent is None or not 0 <= percent <= 100:
+            raise ValueError(f"Markdown must be between 0 and 100 percent, not {percent}")
+        if card_ids is None and not (query and query.strip()):
+            raise ValueError("Pass card ids or a search query to mark down")
+        with self.transaction(action=f"mark down buy prices by {percent}%"):
+            updated_ids = self._select_rows("inventory", card_ids=card_ids, query=query)
+            self.connection.execute("""
+                UPDATE inventory SET buy_price = ROUND(buy_price * ?, 2)
+                WHERE id IN (SELECT id FROM selected_ids) AND buy_price IS NOT NULL
+            """, (1 - percent / 100,))
+            self._notify("inventory", "update", updated_ids)
+        return updated_ids
+
+    def _select_rows(self, table, card_ids=None, query=None):
+        """
+        Fill the temp table selected_ids with the listed ids that exist in table, or with the ids
+        matching a search query, so a bulk statement can filter on it in one pass. Returns the ids.
+        Must run inside a write transaction.
+        """
+        self.connection.execute("CREATE TEMP TABLE IF NOT EXISTS selected_ids (id INTEGER PRIMARY KEY)")
+        self.connection.execute("DELETE FROM selected_ids")
+        if card_ids is not None:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO selected_ids (id) VALUES (?)", ((int(card_id),) for card_id in card_ids)
+            )
+            self.connection.execute(
+                f"DELETE FROM selected_ids WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {table}.id = selected_ids.id)"
+            )
+        else:
+            condition, parameters = self._search_condition(table, query.strip())
+            self.connection.execute(f"INSERT INTO selected_ids (id) SELECT id FROM {table} WHERE {condition}", parameters)
+        return [row[0] for row in self.connection.execute("SELECT id FROM selected_ids ORDER BY id")]
 
     def sell_card(self, card_id, sell_price):
-        with self.connection:
-            card = self.get_card_by_id(card_id)
-            if card:
-                sold_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                self.connection.execute("""
-                    INSERT INTO sold_cards (name, condition, card_number, barcode, sold_date, buy_price, sell_price)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    card['name'], card['condition'], card['card_number'], card['barcode'], sold_date, card['buy_price'],
-                    sell_price))
-                self.connection.execute("DELETE FROM inventory WHERE id = ?", (card_id,))
-
-    def search_inventory(self, query, latest_first=False):
+        """Sell one card and return its sold_cards id, or None if it is no longer in inventory."""
+        with self.transaction(action=f"sell card {card_id}"):
+            sale_id = self.checkout([card_id], sell_price)
+            if sale_id is None:
+                return None
+            return self.connection.execute("SELECT id FROM sold_cards WHERE sale_id = ?", (sale_id,)).fetchone()[0]
+
+    def checkout(self, card_ids, total_price):
+        """
+        Sell several inventory cards as one sale and return the new sale id, or None if none of
+        the cards are still in inventory. total_price is split across the cards in proportion to
+        their buy prices. The cards move with one INSERT ... SELECT and one DELETE, so the whole
+        sale is a single transaction and a single change notification per table.
+        A negative total_price raises ValueError and sells nothing.
+        """
+        sold_date = int(time.time())
+        card_ids = list(dict.fromkeys(int(card_id) for card_id in card_ids))
+        if not card_ids:
+            return None
+        with self.transaction(action=f"sell {count_noun(len(card_ids), 'card')}"):
+            cards = self._get_by_ids("inventory", card_ids)
+            if not cards:
+                return None
+            prices = allocate_sale_price(total_price, [card["buy_price"] for card in cards])
+
+            self.connection.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS checkout_cart (
+                    card_id INTEGER PRIMARY KEY,
+                    sell_price REAL
+                )
+            """)
+            self.connection.execute("DELETE FROM checkout_cart")
+            self.connection.executemany(
+                "INSERT INTO checkout_cart (card_id, sell_price) VALUES (?, ?)",
+                [(card["id"], price) for card, price in zip(cards, prices)]
+            )
+            sale_id = self.connection.execute(
+                "INSERT INTO sales (sold_date, total_price, card_count) VALUES (?, ?, ?)",
+                (sold_date, total_price, len(cards))
+            ).lastrowid
+            self.connection.execute("""
+                INSERT INTO sold_cards (
+                    name, condition, card_number, barcode, sold_date, buy_price, sell_price, sale_id, date_added
+                )
+                SELECT inventory.name, inventory.condition, inventory.card_number, inventory.barcode, ?,
+                       inventory.buy_price, checkout_cart.sell_price, ?, inventory.date_added
+                FROM checkout_cart
+                CROSS JOIN inventory ON inventory.id = checkout_cart.card_id
+                ORDER BY checkout_cart.card_id
+            """, (sold_date, sale_id))
+            self.connection.execute("DELETE FROM inventory WHERE id IN (SELECT card_id FROM checkout_cart)")
+            self.connection.execute("DELETE FROM checkout_cart")
+            sold_ids = [row[0] for row in self.connection.execute(
+                "SELECT id FROM sold_cards WHERE sale_id = ? ORDER BY id", (sale_id,)
+            )]
+            self._notify("inventory", "delete", [card["id"] for card in cards])
+            self._notify("sold_cards", "insert", sold_ids)
+        return sale_id
+
+    def get_conditions(self):
+        """Known condition names, the standard grades first, then the ones entered by hand."""
+        return [row["name"] for row in self.connection.execute("SELECT name FROM conditions ORDER BY id")]
+
+    def get_sale(self, sale_id):
+        return self.connection.execute("SELECT * FROM sales WHERE id = ?", (sale_id,)).fetchone()
+
+    def search_inventory(self, query, latest_first=False, ranked=False):
         query = query.strip()
-        order_clause = "ORDER BY id DESC" if latest_first else ""
         if not query:
             return self.get_inventory_latest_first() if latest_first else self.get_inventory()
-        with self.connection:
-            return self.connection.execute(f"""
-                SELECT * FROM inventory
-                WHERE
-                    name LIKE ? OR
-                    condition LIKE ? OR
-                    card_number LIKE ? OR
-                    barcode LIKE ?
-                {order_clause}
-            """, (
-                f"%{query}%", f"%{query}%", f"%{query}%", f"%{query}%"
-            )).fetchall()
+        return self._search("inventory", query, descending=latest_first, ranked=ranked)
 
-    def search_sold_cards(self, query):
+    def search_sold_cards(self, query, ranked=False):
         query = query.strip()
         if not query:
             return self.get_sold_cards()
-        with self.connection:
-            return self.connection.execute("""
-                SELECT * FROM sold_cards
-                WHERE
-                    name LIKE ? OR
-                    condition LIKE ? OR
-                    card_number LIKE ? OR
-                    barcode LIKE ?
-                ORDER BY id DESC
-            """, (
-                f"%{query}%", f"%{query}%", f"%{query}%", f"%{query}%"
-            )).fetchall()
+        return self._search("sold_cards", query, descending=True, ranked=ranked)
+
+    def _search(self, table, query, descending, ranked):
+        """
+        Substring search over name, condition, card number and barcode.
+        Uses the trigram index when possible, which also covers prefix matches.
+        With ranked=True the best bm25 matches come first instead of ordering by id.
+        Results are cached per table version in self.search_cache.
+        """
+        options = (descending, ranked)
+        version = self.table_versions[table]
+        rows = self.search_cache.get(table, query, options, version)
+        if rows is None and not ranked:
+            # bm25 order cannot be derived from a broader result set, so only plain searches narrow
+            rows = self.search_cache.narrow(table, query, options, version)
+        if rows is None:
+            rows = self._search_database(table, query, descending, ranked)
+        self.search_cache.put(table, query, options, version, rows)
+        return list(rows)
+
+    def _search_database(self, table, query, descending, ranked):
+        direction = "DESC" if descending else "ASC"
+        if self.fts_enabled and len(query) >= FTS_MIN_QUERY_LENGTH:
+            order_clause = f"ORDER BY {table}_fts.rank" if ranked else f"ORDER BY {table}.id {direction}"
+            return self.connection.execute(f"""
+                SELECT {table}.* FROM {table}_fts
+                JOIN {table} ON {table}.id = {table}_fts.rowid
+                WHERE {table}_fts MATCH ?
+                {order_clause}
+            """, (self._fts_phrase(query),)).fetchall()
+
+        return self.connection.execute(f"""
+            SELECT * FROM {table}
+            WHERE
+                name LIKE ? OR
+                condition LIKE ? OR
+                card_number LIKE ? OR
+                barcode LIKE ?
+            ORDER BY id {direction}
+        """, (
+            f"%{query}%", f"%{query}%", f"%{query}%", f"%{query}%"
+        )).fetchall()
+
+    def _search_condition(self, table, query):
+        """WHERE condition and parameters matching the rows that _search_database would return."""
+        if self.fts_enabled and len(query) >= FTS_MIN_QUERY_LENGTH:
+            return f"id IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ?)", (self._fts_phrase(query),)
+        return (
+            "(name LIKE ? OR condition LIKE ? OR card_number LIKE ? OR barcode LIKE ?)",
+            (f"%{query}%", f"%{query}%", f"%{query}%", f"%{query}%")
+        )
+
+    @staticmethod
+    def _fts_phrase(query):
+        # Quote the whole query as one phrase so it matches as a literal substring, like LIKE '%q%'
+        return '"' + query.replace('"', '""') + '"'
 
     def edit_card(self, card_id, name, condition, card_number, buy_price):
-        with self.connection:
+        with self.transaction(action=f"edit {name}"):
             self.connection.execute("""
                 UPDATE inventory
                 SET name = ?, condition = ?, card_number = ?, buy_price = ?
                 WHERE id = ?
             """, (name, condition, card_number, buy_price, card_id))
+        self._notify("inventory", "update", [card_id])
 
     def edit_sold_card(self, card_id, name, condition, card_number, buy_price, sell_price):
-        with self.connection:
+        with self.transaction(action=f"edit sold {name}"):
             self.connection.execute("""
                 UPDATE sold_cards
                 SET name = ?, condition = ?, card_number = ?, buy_price = ?, sell_price = ?
                 WHERE id = ?
             """, (name, condition, card_number, buy_price, sell_price, card_id))
+        self._notify("sold_cards", "update", [card_id])
+
+    def get_next_undo(self):
+        """The action undo would revert, as {id, description}, or None."""
+        return journal.next_undo(self.connection, self.station)
+
+    def get_next_redo(self):
+        """The action redo would apply again, as {id, description}, or None."""
+        return journal.next_redo(self.connection, self.station)
+
+    def undo(self, action_id=None):
+        """
+        Revert this station's most recent action that is not undone yet and return its
+        description, or None if there is nothing to undo. Pass the id from get_next_undo to make
+        sure that action is the one reverted. Raises ValueError if a later action changed the
+        same rows. Listeners hear about the rows it put back the usual way.
+        """
+        return self._replay(journal.undo, action_id)
+
+    def redo(self, action_id=None):
+        """Apply this station's most recently undone action again; works like undo."""
+        return self._replay(journal.redo, action_id)
+
+    def _replay(self, step, action_id):
+        with self.transaction():
+            result = step(self.connection, self.station, action_id)
+            if result is None:
+                return None
+            description, changes = result
+            for table, action, ids in changes:
+                # Sales rows have no view of their own to update
+                if table in self.table_versions:
+                    self._notify(table, action, ids)
+        return description
+
+    def get_undo_history(self, limit=20):
+        """This station's newest journaled actions, newest first, with whether each is done or undone."""
+        return journal.get_history(self.connection, self.station, limit)
 
     def get_sold_card_by_id(self, card_id):
-        with self.connection:
-            return self.connection.execute(
-                "SELECT * FROM sold_cards WHERE id = ?", (card_id,)
-            ).fetchone()
+        return self.connection.execute(
+            "SELECT * FROM sold_cards WHERE id = ?", (card_id,)
+        ).fetchone()
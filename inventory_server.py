@@ -0,0 +1,287 @@
+import argparse
+import copy
+import json
+import queue
+import sqlite3
+import threading
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from database import DatabaseConfig
+from inventory_manager import InventoryManager
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Read methods a station may call, with the table or tables each one reads, so clients know
+# which cached results a change makes stale
+READ_METHODS = {
+    "get_inventory": "inventory",
+    "get_inventory_latest_first": "inventory",
+    "get_inventory_page": "inventory",
+    "get_card_by_id": "inventory",
+    "get_cards_by_ids": "inventory",
+    "find_by_barcode": "inventory",
+    "search_inventory": "inventory",
+    "get_sold_cards": "sold_cards",
+    "get_sold_cards_page": "sold_cards",
+    "get_sold_card_by_id": "sold_cards",
+    "get_sold_cards_by_ids": "sold_cards",
+    "find_sold_by_barcode": "sold_cards",
+    "search_sold_cards": "sold_cards",
+    "get_sale": "sold_cards",
+    "get_dashboard": ("inventory", "sold_cards"),
+    "get_sales_statistics": "sold_cards",
+    "get_conditions": ("inventory", "sold_cards"),
+    "get_undo_history": ("inventory", "sold_cards"),
+    "get_next_undo": ("inventory", "sold_cards"),
+    "get_next_redo": ("inventory", "sold_cards"),
+}
+
+WRITE_METHODS = (
+    "add_card",
+    "add_cards",
+    "allocate_barcodes",
+    "edit_card",
+    "edit_sold_card",
+    "delete_inventory_item",
+    "delete_sold_item",
+    "delete_inventory_items",
+    "delete_sold_items",
+    "set_buy_price",
+    "markdown_buy_prices",
+    "sell_card",
+    "checkout",
+    "undo",
+    "redo",
+)
+
+MAX_WRITE_BATCH = 64
+CHANGE_HISTORY = 4096
+MAX_CHANGE_WAIT = 30.0
+
+
+def to_json(value):
+    """Convert manager results, which may hold sqlite3.Row objects, into JSON-friendly values."""
+    if isinstance(value, sqlite3.Row):
+        return dict(value)
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    return value
+
+
+class ChangeFeed:
+    """
+    Numbered history of committed changes that stations long-poll instead of re-reading tables.
+    Only the newest CHANGE_HISTORY entries are kept; a station that falls further behind is told
+    to reload everything.
+    """
+
+    def __init__(self, history=CHANGE_HISTORY):
+        self.changes = deque(maxlen=history)
+        self.sequence = 0
+        self.condition = threading.Condition()
+
+    def publish(self, table, action, ids):
+        with self.condition:
+            self.sequence += 1
+            self.changes.append((self.sequence, table, action, ids))
+            self.condition.notify_all()
+
+    def wait(self, since, timeout):
+        """Return (sequence, changes after since), or (sequence, None) if since is too old to replay."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.sequence > since, timeout)
+            if since > self.sequence or (self.changes and self.changes[0][0] > since + 1):
+                return self.sequence, None
+            changes = [
+                {"table": table, "action": action, "ids": ids}
+                for sequence, table, action, ids in self.changes if sequence > since
+            ]
+            return self.sequence, changes
+
+
+class WriteJob:
+    def __init__(self, method, args, kwargs, station=""):
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.station = station
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class InventoryServer:
+    """
+    Shares one inventory database between several stations over HTTP.
+    Reads run in parallel on a pool of connections. Writes go to a single writer thread, which
+    commits everything queued behind the current write in one transaction, each call inside its
+    own savepoint so a failing call does not undo the others. Stations learn about committed
+    changes from the /changes long-poll feed.
+    """
+
+    def __init__(self, config=None, host=DEFAULT_HOST, port=DEFAULT_PORT, read_connections=4):
+        self.config = config or DatabaseConfig()
+        # Connections are opened here but used by the writer and request handler threads
+        shared_config = copy.copy(self.config)
+        shared_config.check_same_thread = False
+        self.writer = InventoryManager(config=shared_config)
+        self.feed = ChangeFeed()
+        self.writer.add_change_listener(self.feed.publish)
+        # Stations use this to spot a restarted server, whose change numbers start over
+        self.server_id = uuid.uuid4().hex
+
+        self.readers = queue.Queue()
+        for _ in range(read_connections):
+            reader = InventoryManager(config=shared_config)
+            # Share the writer's versions so the readers' search caches go stale on every commit
+            reader.table_versions = self.writer.table_versions
+            self.readers.put(reader)
+
+        self.write_jobs = queue.Queue()
+        self.writer_thread = threading.Thread(target=self._write_loop, name="InventoryWriter", daemon=True)
+        self.writer_thread.start()
+
+        self.httpd = ThreadingHTTPServer((host, port), InventoryRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.inventory_server = self
+
+    @property
+    def address(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def call(self, method, args, kwargs, station=""):
+        """Run a manager method for a station, which owns the actions it journals and undoes."""
+        if method in READ_METHODS:
+            reader = self.readers.get()
+            try:
+                reader.station = station
+                return getattr(reader, method)(*args, **kwargs)
+            finally:
+                self.readers.put(reader)
+        if method in WRITE_METHODS:
+            job = WriteJob(method, args, kwargs, station)
+            self.write_jobs.put(job)
+            job.done.wait()
+            if job.error is not None:
+                raise job.error
+            return job.result
+        raise ValueError(f"Unknown method: {method}")
+
+    def _write_loop(self):
+        while True:
+            job = self.write_jobs.get()
+            if job is None:
+                break
+            batch = [job]
+            while len(batch) < MAX_WRITE_BATCH:
+                try:
+                    job = self.write_jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    self.write_jobs.put(None)
+                    break
+                batch.append(job)
+            self._write_batch(batch)
+        self.writer.close()
+
+    def _write_batch(self, batch):
+        try:
+            with self.writer.transaction():
+                for job in batch:
+                    try:
+                        self.writer.station = job.station
+                        with self.writer.transaction():
+                            job.result = getattr(self.writer, job.method)(*job.args, **job.kwargs)
+                    except Exception as error:
+                        job.error = error
+        except Exception as error:
+            # The commit itself failed, so none of the batch was written
+            for job in batch:
+                job.result, job.error = None, job.error or error
+        for job in batch:
+            job.done.set()
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.write_jobs.put(None)
+        self.writer_thread.join(timeout=5)
+        while not self.readers.empty():
+            self.readers.get().close()
+
+
+class InventoryRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so a station reuses one connection instead of reconnecting for every call
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/call":
+            self.send_json(404, {"error": {"type": "NotFound", "message": self.path}})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            result = self.server.inventory_server.call(
+                request["method"], request.get("args", []), request.get("kwargs", {}), request.get("station", "")
+            )
+        except Exception as error:
+            self.send_json(200, {"error": {"type": type(error).__name__, "message": str(error)}})
+            return
+        self.send_json(200, {"result": to_json(result)})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/changes":
+            self.send_json(404, {"error": {"type": "NotFound", "message": self.path}})
+            return
+        params = parse_qs(url.query)
+        server = self.server.inventory_server
+        since = int(params.get("since", ["0"])[0])
+        timeout = min(float(params.get("timeout", ["25"])[0]), MAX_CHANGE_WAIT)
+        if params.get("server", [server.server_id])[0] != server.server_id:
+            # The station was following an earlier run of the server
+            since = server.feed.sequence + 1
+            timeout = 0
+        sequence, changes = server.feed.wait(since, timeout)
+        self.send_json(200, {"server": server.server_id, "sequence": sequence, "changes": changes})
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Share one inventory database between several stations.")
+    parser.add_argument("--db", help="database file (default: PKMN_DB_PATH or inventory.db)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--read-connections", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    server = InventoryServer(DatabaseConfig(args.db), args.host, args.port, args.read_connections)
+    print(f"Serving {server.config.path} at {server.address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
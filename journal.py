@@ -0,0 +1,311 @@
+# Append-only journal of changes to the card tables, written by triggers in the same transaction
+# as the change itself, so undo and redo touch only the rows an action changed.
+#
+# Every user action (adding, editing, deleting or selling cards) opens a row in journal_actions,
+# and while it is open the triggers add one journal row per changed row. A journal row keeps a
+# single JSON image of the row: the old values for updates and deletes, and nothing for inserts.
+# Undoing or redoing an entry swaps that image with the row's current values, so each entry always
+# holds the state it would go back to.
+#
+# Actions belong to the station that made them, so stations sharing a server each undo only their
+# own. An action whose rows were changed since by a later action is not undone or redone, since
+# that would overwrite the later change.
+
+JOURNALED_TABLES = ("inventory", "sold_cards", "sales")
+
+# Derived columns that triggers fill in from the others, so they are never journaled themselves
+DERIVED_COLUMNS = ("id", "card_id", "condition_id")
+
+# Undo history kept by compaction: at most this many actions and, beyond the newest action,
+# this many journal rows
+MAX_UNDO_ACTIONS = 100
+MAX_JOURNAL_CHANGES = 200_000
+# Compact after every this many actions
+COMPACT_INTERVAL = 50
+
+
+def create_journal_tables(connection):
+    """Create the journal tables and the triggers that fill them. Must run inside a write transaction."""
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS journal_actions (
+            id INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            station TEXT NOT NULL DEFAULT '',
+            created_at INTEGER NOT NULL,
+            change_count INTEGER NOT NULL DEFAULT 0,
+            state TEXT NOT NULL DEFAULT 'done' CHECK (state IN ('done', 'undone', 'abandoned'))
+        )
+    """)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS journal (
+            id INTEGER PRIMARY KEY,
+            action_id INTEGER NOT NULL REFERENCES journal_actions(id),
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            operation TEXT NOT NULL CHECK (operation IN ('insert', 'update', 'delete')),
+            image TEXT
+        )
+    """)
+    columns = [row["name"] for row in connection.execute("PRAGMA table_info(journal_actions)")]
+    if "station" not in columns:
+        connection.execute("ALTER TABLE journal_actions ADD COLUMN station TEXT NOT NULL DEFAULT ''")
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_journal_action ON journal(action_id)")
+    # Finds later changes to the same rows when checking an undo for conflicts
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_journal_row ON journal(table_name, row_id)")
+    # The action being recorded, or NULL when changes are not journaled
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS journal_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            action_id INTEGER
+        )
+    """)
+    connection.execute("INSERT OR IGNORE INTO journal_state (id, action_id) VALUES (1, NULL)")
+    for table in JOURNALED_TABLES:
+        create_journal_triggers(connection, table)
+
+
+def journaled_columns(connection, table):
+    return [
+        row["name"] for row in connection.execute(f"PRAGMA table_info({table})")
+        if row["name"] not in DERIVED_COLUMNS
+    ]
+
+
+def _image(connection, table, row):
+    return "json_object(" + ", ".join(f"'{column}', {row}.{column}" for column in journaled_columns(connection, table)) + ")"
+
+
+def drop_journal_triggers(connection):
+    """Drop the journal triggers, e.g. before a migration drops a column they copy."""
+    for table in JOURNALED_TABLES:
+        for operation in ("insert", "update", "delete"):
+            connection.execute(f"DROP TRIGGER IF EXISTS {table}_journal_{operation}")
+
+
+def create_journal_triggers(connection, table):
+    # Recreated every time, so the images follow columns added or dropped by migrations
+    for operation in ("insert", "update", "delete"):
+        connection.execute(f"DROP TRIGGER IF EXISTS {table}_journal_{operation}")
+    current_action = "(SELECT action_id FROM journal_state WHERE id = 1)"
+    for operation, event, row, image in (
+        ("insert", "INSERT", "new", "NULL"),
+        ("update", f"UPDATE OF {', '.join(journaled_columns(connection, table))}", "old", _image(connection, table, "old")),
+        ("delete", "DELETE", "old", _image(connection, table, "old")),
+    ):
+        connection.execute(f"""
+            CREATE TRIGGER {table}_journal_{operation} AFTER {event} ON {table}
+            WHEN {current_action} IS NOT NULL BEGIN
+                INSERT INTO journal (action_id, table_name, row_id, operation, image)
+                VALUES ({current_action}, '{table}', {row}.id, '{operation}', {image});
+            END
+        """)
+
+
+def begin_action(connection, description, station=""):
+    """
+    Start recording an action by station; changes from here until end_action are undone together.
+    """
+    action_id = connection.execute("""
+        INSERT INTO journal_actions (description, station, created_at)
+        VALUES (?, ?, CAST(strftime('%s', 'now') AS INTEGER))
+    """, (description, station)).lastrowid
+    connection.execute("UPDATE journal_state SET action_id = ? WHERE id = 1", (action_id,))
+    return action_id
+
+
+def end_action(connection, action_id):
+    connection.execute("UPDATE journal_state SET action_id = NULL WHERE id = 1")
+    changes = connection.execute("SELECT COUNT(*) FROM journal WHERE action_id = ?", (action_id,)).fetchone()[0]
+    if changes:
+        connection.execute("UPDATE journal_actions SET change_count = ? WHERE id = ?", (changes, action_id))
+        # The station's undone actions can no longer be redone once it has changed something else
+        connection.execute("""
+            UPDATE journal_actions SET state = 'abandoned'
+            WHERE state = 'undone' AND station = (SELECT station FROM journal_actions WHERE id = ?)
+        """, (action_id,))
+    else:
+        # Nothing changed, e.g. deleting cards that were already gone: nothing to undo either
+        connection.execute("DELETE FROM journal_actions WHERE id = ?", (action_id,))
+    if action_id % COMPACT_INTERVAL == 0:
+        compact(connection)
+
+
+def next_undo(connection, station=""):
+    """The station's newest action that is not undone yet, as {id, description}, or None."""
+    row = connection.execute(
+        "SELECT id, description FROM journal_actions WHERE state = 'done' AND station = ? ORDER BY id DESC LIMIT 1",
+        (station,)
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def next_redo(connection, station=""):
+    """The station's most recently undone action, as {id, description}, or None."""
+    row = connection.execute(
+        "SELECT id, description FROM journal_actions WHERE state = 'undone' AND station = ? ORDER BY id LIMIT 1",
+        (station,)
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def undo(connection, station="", action_id=None):
+    """
+    Revert the station's newest action that is not undone yet. Returns (description, changes) or
+    None if there is nothing to undo, where changes lists (table, action, ids) for the rows
+    touched. With action_id, raises ValueError unless that is still the action to undo.
+    Must run inside a write transaction.
+    """
+    return _step(connection, next_undo(connection, station), action_id, undoing=True)
+
+
+def redo(connection, station="", action_id=None):
+    """Apply the station's most recently undone action again; works like undo."""
+    return _step(connection, next_redo(connection, station), action_id, undoing=False)
+
+
+def _step(connection, action, action_id, undoing):
+    verb = "undo" if undoing else "redo"
+    if action_id is not None and (action is None or action["id"] != action_id):
+        raise ValueError(f"Nothing to {verb}: the history changed, try again")
+    if action is None:
+        return None
+    # The newest change of every other row is already in effect, so only a later action that is
+    # still in effect and touched the same rows stands in the way
+    conflicts = connection.execute("""
+        SELECT COUNT(DISTINCT later.row_id) FROM journal AS mine
+        JOIN journal AS later ON later.table_name = mine.table_name AND later.row_id = mine.row_id
+        JOIN journal_actions ON journal_actions.id = later.action_id
+        WHERE mine.action_id = ? AND later.action_id > mine.action_id AND journal_actions.state = 'done'
+    """, (action["id"],)).fetchone()[0]
+    if conflicts:
+        raise ValueError(
+            f"Cannot {verb} {action['description']}: {conflicts} of its rows were changed since by a later action"
+        )
+    changes = _apply(connection, action["id"], undoing)
+    connection.execute(
+        "UPDATE journal_actions SET state = ? WHERE id = ?", ("undone" if undoing else "done", action["id"])
+    )
+    return action["description"], changes
+
+
+def _apply(connection, action_id, undoing):
+    """
+    Undo or redo one action's entries. Consecutive entries on the same table and operation are
+    applied with one statement each, last run first when undoing, so the cost follows the
+    number of entries and not the size of the tables.
+    """
+    entries = connection.execute(
+        "SELECT id, table_name, operation, row_id FROM journal WHERE action_id = ? ORDER BY id", (action_id,)
+    ).fetchall()
+    runs = []
+    for entry in entries:
+        run = runs[-1] if runs else None
+        # A row changed twice in one action needs its own run, so the changes apply in order
+        if (run is None or run["table"] != entry["table_name"] or run["operation"] != entry["operation"]
+                or entry["row_id"] in run["row_ids"]):
+            run = {"table": entry["table_name"], "operation": entry["operation"], "first": entry["id"], "row_ids": set()}
+            runs.append(run)
+        run["last"] = entry["id"]
+        run["row_ids"].add(entry["row_id"])
+
+    changes = []
+    for run in (reversed(runs) if undoing else runs):
+        table, operation, bounds = run["table"], run["operation"], (run["first"], run["last"])
+        if operation == "update":
+            _swap(connection, table, bounds)
+            changes.append((table, "update", sorted(run["row_ids"])))
+        elif (operation == "insert") == undoing:
+            _remove(connection, table, bounds)
+            changes.append((table, "delete", sorted(run["row_ids"])))
+        else:
+            _restore(connection, table, bounds)
+            changes.append((table, "insert", sorted(run["row_ids"])))
+    return changes
+
+
+def _restore(connection, table, bounds):
+    # Put rows back from their images, with their old ids
+    columns = journaled_columns(connection, table)
+    connection.execute(f"""
+        INSERT INTO {table} (id, {", ".join(columns)})
+        SELECT row_id, {", ".join(f"json_extract(image, '$.{column}')" for column in columns)}
+        FROM journal
+        WHERE id BETWEEN ? AND ? AND image IS NOT NULL
+        ORDER BY id
+    """, bounds)
+
+
+def _remove(connection, table, bounds):
+    # Keep each row's current values in its entry, so it can be restored again, then delete it
+    connection.execute(f"""
+        UPDATE journal SET image = (SELECT {_image(connection, table, table)} FROM {table} WHERE {table}.id = journal.row_id)
+        WHERE id BETWEEN ? AND ?
+    """, bounds)
+    connection.execute(
+        f"DELETE FROM {table} WHERE id IN (SELECT row_id FROM journal WHERE id BETWEEN ? AND ?)", bounds
+    )
+
+
+def _swap(connection, table, bounds):
+    # Exchange each row's current values with the ones in its entry, matching the two through a
+    # temp table keyed both ways so every lookup is a primary key or unique index seek
+    columns = journaled_columns(connection, table)
+    connection.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS journal_swap (
+            entry_id INTEGER PRIMARY KEY,
+            row_id INTEGER UNIQUE,
+            image TEXT
+        )
+    """)
+    connection.execute("DELETE FROM journal_swap")
+    connection.execute(f"""
+        INSERT INTO journal_swap (entry_id, row_id, image)
+        SELECT journal.id, journal.row_id, {_image(connection, table, table)}
+        FROM journal JOIN {table} ON {table}.id = journal.row_id
+        WHERE journal.id BETWEEN ? AND ?
+    """, bounds)
+    connection.execute(f"""
+        UPDATE {table} SET ({", ".join(columns)}) = (
+            SELECT {", ".join(f"json_extract(journal.image, '$.{column}')" for column in columns)}
+            FROM journal_swap JOIN journal ON journal.id = journal_swap.entry_id
+            WHERE journal_swap.row_id = {table}.id
+        )
+        WHERE id IN (SELECT row_id FROM journal_swap)
+    """)
+    connection.execute("""
+        UPDATE journal SET image = (SELECT image FROM journal_swap WHERE journal_swap.entry_id = journal.id)
+        WHERE id IN (SELECT entry_id FROM journal_swap)
+    """)
+    connection.execute("DELETE FROM journal_swap")
+
+
+def compact(connection, max_actions=MAX_UNDO_ACTIONS, max_changes=MAX_JOURNAL_CHANGES):
+    """
+    Drop the oldest actions and their entries once there are more than max_actions, or more
+    than max_changes entries behind the newest action. Returns the number of actions dropped.
+    """
+    cutoff = connection.execute("""
+        SELECT id FROM (
+            SELECT
+                id,
+                ROW_NUMBER() OVER (ORDER BY id DESC) AS newer_actions,
+                SUM(change_count) OVER (ORDER BY id DESC) AS newer_changes
+            FROM journal_actions
+        )
+        WHERE newer_actions > 1 AND (newer_actions > ? OR newer_changes > ?)
+        ORDER BY id DESC
+        LIMIT 1
+    """, (max_actions, max_changes)).fetchone()
+    if cutoff is None:
+        return 0
+    connection.execute("DELETE FROM journal WHERE action_id <= ?", (cutoff[0],))
+    return connection.execute("DELETE FROM journal_actions WHERE id <= ?", (cutoff[0],)).rowcount
+
+
+def get_history(connection, station="", limit=20):
+    """The station's newest actions with their state, newest first."""
+    return [dict(row) for row in connection.execute("""
+        SELECT id, description, created_at, change_count, state FROM journal_actions
+        WHERE station = ?
+        ORDER BY id DESC LIMIT ?
+    """, (station, limit))]
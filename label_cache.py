@@ -0,0 +1,73 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+from barcode_generator import render_label
+
+# Labels are around 10 KiB each, so this keeps tens of thousands of them
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def default_cache_directory():
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "PKMN", "labels")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "pkmn", "labels")
+
+
+class LabelCache:
+    """
+    On-disk cache of rendered label images. Files are named after a hash of the barcode, name and
+    condition, so a label is rendered the first time it is asked for and again only after its
+    caption changes. The least recently used files are removed once the cache grows past max_bytes.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_directory()
+        self.max_bytes = max_bytes
+        self.files = None  # path -> size, least recently used first; loaded on first use
+        self.total_bytes = 0
+
+    @staticmethod
+    def key(barcode, name, condition):
+        caption = "\0".join(str(part) for part in (barcode, name, condition))
+        return hashlib.sha1(caption.encode("utf-8")).hexdigest()
+
+    def get_label(self, barcode, name, condition):
+        """Return the path of the label image for these values, rendering it if it is not cached."""
+        self._load()
+        path = os.path.join(self.directory, f"{self.key(barcode, name, condition)}.png")
+        if path in self.files and os.path.exists(path):
+            # Touch the file so recency survives a restart, which orders the index by mtime
+            os.utime(path)
+            self.files.move_to_end(path)
+            return path
+
+        render_label(barcode, name, condition).save(path)
+        self.total_bytes += os.path.getsize(path) - self.files.pop(path, 0)
+        self.files[path] = os.path.getsize(path)
+        self._evict()
+        return path
+
+    def _load(self):
+        if self.files is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        entries = [
+            entry for entry in os.scandir(self.directory) if entry.is_file() and entry.name.endswith(".png")
+        ]
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        self.files = OrderedDict((entry.path, entry.stat().st_size) for entry in entries)
+        self.total_bytes = sum(self.files.values())
+        self._evict()
+
+    def _evict(self):
+        # Never evict the newest file, which is the one just requested
+        while self.total_bytes > self.max_bytes and len(self.files) > 1:
+            path, size = self.files.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
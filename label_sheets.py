@@ -0,0 +1,81 @@
+import os
+
+from barcode_generator import render_labels
+
+# Page sizes in millimetres
+PAGE_SIZES = {
+    "A4": (210.0, 297.0),
+    "Letter": (215.9, 279.4),
+}
+
+DPI = 300
+MM_PER_INCH = 25.4
+
+
+def render_card_label_sheets(manager, card_ids, output_path, **options):
+    """Render label sheets for inventory cards by id; options are passed to render_label_sheets."""
+    cards = ((card["barcode"], card["name"], card["condition"]) for card in manager.get_cards_by_ids(card_ids))
+    return render_label_sheets(cards, output_path, **options)
+
+
+def render_label_sheets(cards, output_path, page_size="A4", columns=3, rows=8, margin_mm=8.0, progress=None):
+    """
+    Tile labels for (barcode, name, condition) cards onto printable pages, columns x rows per page.
+    A .pdf output_path gets one multi-page PDF; any other extension gets one image per page,
+    named like labels-001.png. Labels render on every core through render_labels while pages
+    are assembled and written one at a time, so memory stays at one page and a few chunks of
+    labels however many cards there are. progress(labels_done) is called after each page.
+    Returns the list of files written.
+    """
+    from PIL import Image
+
+    page_width, page_height = (round(size / MM_PER_INCH * DPI) for size in PAGE_SIZES[page_size])
+    margin = round(margin_mm / MM_PER_INCH * DPI)
+    cell_width = (page_width - 2 * margin) // columns
+    cell_height = (page_height - 2 * margin) // rows
+    per_page = columns * rows
+
+    base, extension = os.path.splitext(output_path)
+    is_pdf = extension.lower() == ".pdf"
+    written = []
+    labels_done = 0
+    page = None
+    slot = 0
+
+    # Labels come back greyscale and shrunk to fit their cell with a small gutter
+    for label in render_labels(cards, size=(cell_width - 20, cell_height - 20)):
+        if page is None:
+            # Labels are black on white, so a greyscale page is a third the size of RGB
+            page = Image.new("L", (page_width, page_height), 255)
+            slot = 0
+        column, row = slot % columns, slot // columns
+        x = margin + column * cell_width + (cell_width - label.width) // 2
+        y = margin + row * cell_height + (cell_height - label.height) // 2
+        page.paste(label, (x, y))
+        slot += 1
+        labels_done += 1
+
+        if slot == per_page:
+            _write_page(page, base, extension, is_pdf, written)
+            page = None
+            if progress:
+                progress(labels_done)
+
+    if page is not None:
+        _write_page(page, base, extension, is_pdf, written)
+        if progress:
+            progress(labels_done)
+    return written
+
+
+def _write_page(page, base, extension, is_pdf, written):
+    if is_pdf:
+        path = base + extension
+        # Appending adds the page to the file on disk instead of holding every page for save_all
+        page.save(path, "PDF", resolution=DPI, append=bool(written))
+        if not written:
+            written.append(path)
+    else:
+        path = f"{base}-{len(written) + 1:03d}{extension or '.png'}"
+        page.save(path, dpi=(DPI, DPI))
+        written.append(path)
@@ -1,8 +1,43 @@
+import argparse
+import functools
+import multiprocessing
+import os
+import instrumentation
 from ui import InventoryApp
 
 if __name__ == "__main__":
-    app = InventoryApp()
-    app.run()
+    # Needed for the barcode rendering process pool in the packaged .exe
+    multiprocessing.freeze_support()
+
+    parser = argparse.ArgumentParser(description="PKMN inventory manager")
+    parser.add_argument(
+        "--server", default=os.environ.get("PKMN_SERVER_URL"),
+        help="URL of a shared inventory server, e.g. http://192.168.1.20:8765 (default: PKMN_SERVER_URL)"
+    )
+    parser.add_argument("--serve", action="store_true", help="run the shared inventory server instead of the app")
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="time operations and log slow queries; press F12 for the diagnostics window (or set PKMN_PROFILE)"
+    )
+    parser.add_argument(
+        "--slow-query-ms", type=float,
+        help=f"log statements slower than this (default: PKMN_SLOW_QUERY_MS or {instrumentation.DEFAULT_SLOW_QUERY_MS:g})"
+    )
+    args, server_args = parser.parse_known_args()
+
+    if args.profile:
+        instrumentation.enable(args.slow_query_ms)
+
+    if args.serve:
+        from inventory_server import main as serve
+        serve(server_args)
+    else:
+        if args.server:
+            from inventory_client import RemoteInventoryManager
+            app = InventoryApp(manager_factory=functools.partial(RemoteInventoryManager, args.server))
+        else:
+            app = InventoryApp()
+        app.run()
 
     # allow inventory AND sold to load on boot
     # add sell price in sold tab
@@ -10,4 +45,4 @@ if __name__ == "__main__":
     # add bought price
     # date of sale/purchase
     # add card name and condition to barcode png
-    # clean up gui
\ No newline at end of file
+    # clean up gui
@@ -0,0 +1,280 @@
+import re
+import sqlite3
+
+import analytics
+import journal
+from database import transaction
+
+# Rows rewritten per transaction while backfilling, so other stations are never locked out for long
+BATCH_SIZE = 5000
+
+# Conditions offered in the condition drop-down of a new database, best first
+STANDARD_CONDITIONS = ("Mint", "Near Mint", "Lightly Played", "Moderately Played", "Heavily Played", "Damaged")
+
+# Timestamp columns that older versions stored as "%Y-%m-%d %H:%M:%S" local-time text
+TIMESTAMP_COLUMNS = (
+    ("inventory", "date_added"),
+    ("sold_cards", "sold_date"),
+    ("sold_cards", "date_added"),
+    ("sales", "sold_date"),
+)
+
+
+def migrate(connection, batch_size=BATCH_SIZE, progress=None, fresh=False):
+    """
+    Bring the schema up to the newest version. The version is kept in PRAGMA user_version, and
+    each migration stamps it when done. Migrations backfill in batches of their own transactions
+    and pick up where they left off if the app is closed halfway. progress(message) is called
+    before each migration. A fresh database, whose tables create_tables has just made in the
+    newest layout, gets what the migrations would add and is stamped with the newest version.
+    """
+    if fresh:
+        with transaction(connection):
+            create_timestamp_indexes(connection)
+            create_catalog(connection)
+            create_catalog_indexes(connection)
+            connection.execute(f"PRAGMA user_version = {LATEST_VERSION}")
+        return LATEST_VERSION
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    for target, description, migration in MIGRATIONS:
+        if version >= target:
+            continue
+        if progress:
+            progress(f"Upgrading database: {description}")
+        migration(connection, batch_size)
+        with transaction(connection):
+            connection.execute(f"PRAGMA user_version = {target}")
+        version = target
+    return version
+
+
+def column_types(connection, table):
+    return {row["name"]: row["type"].upper() for row in connection.execute(f"PRAGMA table_info({table})")}
+
+
+def backfill(connection, table, assignment, batch_size, where="1"):
+    """Run UPDATE table SET assignment over every row matching where, one id range per transaction."""
+    last_id = 0
+    while True:
+        ids = [row[0] for row in connection.execute(
+            f"SELECT id FROM {table} WHERE id > ? AND ({where}) ORDER BY id LIMIT ?", (last_id, batch_size)
+        )]
+        if not ids:
+            return
+        with transaction(connection):
+            connection.execute(
+                f"UPDATE {table} SET {assignment} WHERE id BETWEEN ? AND ? AND ({where})", (ids[0], ids[-1])
+            )
+        last_id = ids[-1]
+
+
+def integer_timestamps(connection, batch_size):
+    """
+    Store timestamps as INTEGER Unix seconds instead of local-time text, and index them, so date
+    ranges are plain integer comparisons. Each text column is renamed to <column>_text and a new
+    INTEGER column takes its name and is backfilled. The text columns are dropped by a later
+    migration, since dropping a column rewrites the whole table in one transaction.
+    """
+    with transaction(connection):
+        # The summary triggers read these columns; renaming would rewrite them to the text copies
+        analytics.drop_analytics_triggers(connection)
+
+    for table, column in TIMESTAMP_COLUMNS:
+        legacy = f"{column}_text"
+        types = column_types(connection, table)
+        if column not in types:
+            continue
+        if legacy not in types:
+            if types[column] == "INTEGER":
+                continue
+            with transaction(connection):
+                connection.execute(f"ALTER TABLE {table} RENAME COLUMN {column} TO {legacy}")
+                connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER")
+        # 'utc' reads the text as local time, which is how older versions wrote it
+        backfill(
+            connection, table,
+            f"{column} = CAST(ROUND((julianday({legacy}, 'utc') - 2440587.5) * 86400) AS INTEGER)",
+            batch_size,
+            where=f"{column} IS NULL AND {legacy} IS NOT NULL",
+        )
+
+    with transaction(connection):
+        create_timestamp_indexes(connection)
+        if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'sales_summary'").fetchone():
+            analytics.create_analytics_triggers(connection)
+            analytics.rebuild_summaries(connection)
+
+
+def create_timestamp_indexes(connection):
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_inventory_date_added ON inventory(date_added)")
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_sold_cards_sold_date ON sold_cards(sold_date)")
+
+
+def card_catalog(connection, batch_size):
+    """
+    Add a cards catalog (one row per name and card number) and a conditions table, and point
+    every inventory and sold card at them through card_id and condition_id. The text columns
+    stay as they are for display and the search index; triggers keep the ids in step with them,
+    so grouping by card or condition is an integer index lookup.
+    """
+    with transaction(connection):
+        create_catalog(connection)
+        for table in ("inventory", "sold_cards"):
+            connection.execute(f"""
+                INSERT OR IGNORE INTO cards (name, card_number)
+                SELECT DISTINCT name, COALESCE(card_number, '') FROM {table} WHERE name IS NOT NULL
+            """)
+            connection.execute(f"""
+                INSERT OR IGNORE INTO conditions (name)
+                SELECT DISTINCT condition FROM {table} WHERE condition IS NOT NULL
+            """)
+
+    for table in ("inventory", "sold_cards"):
+        backfill(connection, table, f"""
+            card_id = (
+                SELECT cards.id FROM cards
+                WHERE cards.name = {table}.name AND cards.card_number = COALESCE({table}.card_number, '')
+            ),
+            condition_id = (SELECT conditions.id FROM conditions WHERE conditions.name = {table}.condition)
+        """, batch_size, where="card_id IS NULL OR condition_id IS NULL")
+
+    with transaction(connection):
+        create_catalog_indexes(connection)
+
+
+def create_catalog(connection):
+    # The catalog tables, the id columns and their triggers, without linking existing cards
+    create_catalog_tables(connection)
+    for table in ("inventory", "sold_cards"):
+        types = column_types(connection, table)
+        if "card_id" not in types:
+            connection.execute(f"ALTER TABLE {table} ADD COLUMN card_id INTEGER REFERENCES cards(id)")
+        if "condition_id" not in types:
+            connection.execute(f"ALTER TABLE {table} ADD COLUMN condition_id INTEGER REFERENCES conditions(id)")
+        create_catalog_triggers(connection, table)
+    connection.executemany(
+        "INSERT OR IGNORE INTO conditions (name) VALUES (?)", ((name,) for name in STANDARD_CONDITIONS)
+    )
+
+
+def create_catalog_tables(connection):
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS cards (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            card_number TEXT NOT NULL DEFAULT '',
+            UNIQUE (name, card_number)
+        )
+    """)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS conditions (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE COLLATE NOCASE
+        )
+    """)
+
+
+def create_catalog_triggers(connection, table):
+    link = f"""
+        INSERT OR IGNORE INTO cards (name, card_number)
+        SELECT new.name, COALESCE(new.card_number, '') WHERE new.name IS NOT NULL;
+        INSERT OR IGNORE INTO conditions (name) SELECT new.condition WHERE new.condition IS NOT NULL;
+        UPDATE {table} SET
+            card_id = (
+                SELECT id FROM cards WHERE name = new.name AND card_number = COALESCE(new.card_number, '')
+            ),
+            condition_id = (SELECT id FROM conditions WHERE name = new.condition)
+        WHERE id = new.id;
+    """
+    connection.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_catalog_insert AFTER INSERT ON {table} BEGIN
+            {link}
+        END
+    """)
+    connection.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_catalog_update
+        AFTER UPDATE OF name, card_number, condition ON {table} BEGIN
+            {link}
+        END
+    """)
+
+
+def create_catalog_indexes(connection):
+    for table in ("inventory", "sold_cards"):
+        connection.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_card ON {table}(card_id)")
+        connection.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_condition ON {table}(condition_id)")
+
+
+def drop_text_timestamps(connection, batch_size):
+    """
+    Drop the <column>_text copies left by integer_timestamps. Each drop rewrites its whole table
+    in one transaction, which is why it runs as its own step after the batched backfill.
+    """
+    with transaction(connection):
+        # They copy every column; create_tables recreates them for the new layout
+        journal.drop_journal_triggers(connection)
+    for table, column in TIMESTAMP_COLUMNS:
+        legacy = f"{column}_text"
+        if legacy not in column_types(connection, table):
+            continue
+        with transaction(connection):
+            try:
+                connection.execute(f"ALTER TABLE {table} DROP COLUMN {legacy}")
+            except sqlite3.OperationalError:
+                # SQLite before 3.35 cannot drop columns; the unused text copy stays behind
+                pass
+
+
+def autoincrement_ids(connection, batch_size):
+    """
+    Rebuild inventory and sold_cards with AUTOINCREMENT ids, so the id of a deleted card is never
+    handed out again and ids only ever grow, which incremental exports checkpoint on. Rows are
+    copied into <table>_rebuild in batches of their own transactions, resuming after the last
+    copied id; the swap and the table's indexes and triggers are recreated in one final one.
+    """
+    for table in ("inventory", "sold_cards"):
+        sql = connection.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+        if "AUTOINCREMENT" in sql.upper():
+            continue
+        rebuild = f"{table}_rebuild"
+        # The same columns and constraints, only with AUTOINCREMENT on the id
+        create_rebuild, found = re.subn(
+            r"^CREATE TABLE\s+\w+\s*\((\s*)id INTEGER PRIMARY KEY",
+            f"CREATE TABLE IF NOT EXISTS {rebuild} (\\1id INTEGER PRIMARY KEY AUTOINCREMENT",
+            sql, flags=re.IGNORECASE,
+        )
+        if not found:
+            raise sqlite3.DatabaseError(f"Unexpected layout of the {table} table: {sql}")
+        with transaction(connection):
+            connection.execute(create_rebuild)
+        columns = ", ".join(column_types(connection, table))
+        while True:
+            with transaction(connection):
+                copied = connection.execute(f"""
+                    INSERT INTO {rebuild} ({columns})
+                    SELECT {columns} FROM {table}
+                    WHERE id > (SELECT COALESCE(MAX(id), 0) FROM {rebuild})
+                    ORDER BY id LIMIT ?
+                """, (batch_size,)).rowcount
+            if copied < batch_size:
+                break
+        with transaction(connection):
+            # Indexes and triggers go with the old table, so they are read first and made again
+            schema = [row[0] for row in connection.execute(
+                "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+                (table,)
+            )]
+            connection.execute(f"DROP TABLE {table}")
+            connection.execute(f"ALTER TABLE {rebuild} RENAME TO {table}")
+            for statement in schema:
+                connection.execute(statement)
+
+
+# (version, description, migration), applied in order to databases below that version
+MIGRATIONS = (
+    (1, "storing dates as integers", integer_timestamps),
+    (2, "adding the card catalog", card_catalog),
+    (3, "removing the old text dates", drop_text_timestamps),
+    (4, "keeping card ids unique", autoincrement_ids),
+)
+LATEST_VERSION = MIGRATIONS[-1][0]
@@ -0,0 +1,186 @@
+import bisect
+
+
+class PagedTreeview:
+    """
+    Windowed view over a ttk.Treeview. Only a few keyset pages are held as Tk items at a time:
+    pages are fetched as the scrollbar nears either end and pages that scroll far out of view
+    are dropped again, so memory and redraw time do not grow with the table.
+    Items are keyed by card id, so single rows can be updated in place.
+    Pages arrive asynchronously; a page or result set requested before the latest
+    reset or search is ignored when it arrives.
+    """
+
+    # Load another page once the visible area is within this fraction of either end
+    EDGE_FRACTION = 0.1
+
+    def __init__(self, tree, scrollbar, fetch_page, row_values, page_size=100, max_pages=3, descending=False):
+        """
+        fetch_page(anchor_id, limit, backwards, callback) calls back with rows in display order;
+        row_values(row) returns the column values for one row.
+        """
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.fetch_page = fetch_page
+        self.row_values = row_values
+        self.page_size = page_size
+        self.max_rows = page_size * max_pages
+        self.descending = descending
+        self.paging = False
+        self.has_before = False
+        self.has_after = False
+        self.check_pending = False
+        self.loading = False
+        self.generation = 0
+        self.tree.configure(yscrollcommand=self.on_scroll)
+
+    def reset(self):
+        """Show the first page of the table again."""
+        self.clear()
+        self.paging = True
+        self.append_page()
+
+    def show_results(self, fetch_rows):
+        """
+        Show a fixed result set, such as search results, without paging.
+        fetch_rows(callback) calls back with the rows.
+        """
+        self.generation += 1
+        self.loading = False
+        fetch_rows(self.current(self.show_rows))
+
+    def show_rows(self, rows):
+        self.clear()
+        self.paging = False
+        for row in rows:
+            self.tree.insert("", "end", iid=str(row["id"]), values=self.row_values(row))
+
+    def clear(self):
+        self.generation += 1
+        self.loading = False
+        self.tree.delete(*self.tree.get_children())
+        self.has_before = False
+        self.has_after = False
+
+    def current(self, callback):
+        """Wrap a callback so it is dropped if the view was reset or searched in the meantime."""
+        generation = self.generation
+
+        def guarded(*args):
+            if generation == self.generation:
+                callback(*args)
+        return guarded
+
+    def upsert(self, rows):
+        """
+        Refresh rows that are on screen and insert new ones where they belong in the loaded window.
+        Rows that fall outside the window are picked up by paging, and search results only get
+        updates because a new row may not match the search.
+        """
+        for row in rows:
+            iid = str(row["id"])
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=self.row_values(row))
+            elif self.paging:
+                index = self.insert_index(row["id"])
+                if index is not None:
+                    self.tree.insert("", index, iid=iid, values=self.row_values(row))
+        self.trim()
+
+    def remove(self, ids):
+        existing = [str(card_id) for card_id in ids if self.tree.exists(str(card_id))]
+        if existing:
+            self.tree.delete(*existing)
+
+    def insert_index(self, card_id):
+        # Children are sorted by id in display order, so the position is a binary search
+        sign = -1 if self.descending else 1
+        keys = [sign * int(iid) for iid in self.tree.get_children()]
+        index = bisect.bisect_left(keys, sign * card_id)
+        if keys and index == 0 and self.has_before:
+            return None
+        if keys and index == len(keys) and self.has_after:
+            return None
+        return index
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # Paging from inside the scroll callback would re-enter it, so wait until Tk is idle
+        if self.paging and not self.check_pending:
+            self.check_pending = True
+            self.tree.after_idle(self.check_edges)
+
+    def check_edges(self):
+        self.check_pending = False
+        first, last = self.tree.yview()
+        if last >= 1 - self.EDGE_FRACTION and self.has_after:
+            self.append_page()
+        elif first <= self.EDGE_FRACTION and self.has_before:
+            self.prepend_page()
+
+    def append_page(self):
+        if self.loading:
+            return
+        children = self.tree.get_children()
+        anchor_id = int(children[-1]) if children else None
+        self.loading = True
+        self.fetch_page(anchor_id, self.page_size, False, self.current(self.on_page_after))
+
+    def on_page_after(self, rows):
+        self.loading = False
+        self.has_after = len(rows) == self.page_size
+        for row in rows:
+            iid = str(row["id"])
+            if not self.tree.exists(iid):
+                self.tree.insert("", "end", iid=iid, values=self.row_values(row))
+        self.trim(keep_end=True)
+
+    def prepend_page(self):
+        if self.loading:
+            return
+        children = self.tree.get_children()
+        if not children:
+            return
+        self.loading = True
+        self.fetch_page(int(children[0]), self.page_size, True, self.current(self.on_page_before))
+
+    def on_page_before(self, rows):
+        self.loading = False
+        self.has_before = len(rows) == self.page_size
+        rows = [row for row in rows if not self.tree.exists(str(row["id"]))]
+        if not rows:
+            return
+        first_index = self.first_visible_index(self.tree.get_children())
+        for index, row in enumerate(rows):
+            self.tree.insert("", index, iid=str(row["id"]), values=self.row_values(row))
+        self.scroll_to_index(first_index + len(rows))
+        self.trim(keep_end=False)
+
+    def trim(self, keep_end=None):
+        """
+        Drop rows beyond the window size from one end. By default the end farther
+        from the visible rows is dropped.
+        """
+        children = self.tree.get_children()
+        excess = len(children) - self.max_rows
+        if excess <= 0:
+            return
+        first_index = self.first_visible_index(children)
+        if keep_end is None:
+            keep_end = first_index > len(children) // 2
+        if keep_end:
+            self.tree.delete(*children[:excess])
+            self.has_before = True
+            self.scroll_to_index(first_index - excess)
+        else:
+            self.tree.delete(*children[-excess:])
+            self.has_after = True
+
+    def first_visible_index(self, children):
+        return int(self.tree.yview()[0] * len(children))
+
+    def scroll_to_index(self, index):
+        # Keep the rows the user was looking at in place after items were added or dropped above them
+        count = len(self.tree.get_children())
+        if count:
+            self.tree.yview_moveto(max(index, 0) / count)
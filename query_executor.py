@@ -0,0 +1,147 @@
+import itertools
+import queue
+import threading
+
+import instrumentation
+
+
+class QueryExecutor:
+    """
+    Runs InventoryManager calls on a single worker thread that owns its own SQLite connection,
+    so the Tk main loop never waits on the database or on barcode rendering.
+    Results come back to the Tk thread through a queue that is polled with root.after,
+    because Tk widgets must only be touched from the thread that created them.
+    """
+
+    POLL_INTERVAL_MS = 20
+
+    def __init__(self, root, manager_factory, error_handler=None, on_busy_changed=None):
+        """
+        manager_factory() is called on the worker thread to create the manager.
+        error_handler(exception) runs on the Tk thread when a task fails without its own on_error,
+        and on_busy_changed(busy) runs whenever the executor starts or stops having pending work.
+        """
+        self.root = root
+        self.manager_factory = manager_factory
+        self.error_handler = error_handler
+        self.on_busy_changed = on_busy_changed
+        self.change_listeners = []
+
+        self.tasks = queue.Queue()
+        self.results = queue.Queue()
+        self.task_numbers = itertools.count(1)
+        self.latest_by_channel = {}
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.closed = False
+
+        self.thread = threading.Thread(target=self._run, name="QueryExecutor", daemon=True)
+        self.thread.start()
+        self.poll_id = self.root.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def submit(self, method, *args, callback=None, on_error=None, channel=None, **kwargs):
+        """
+        Run a manager method on the worker. method is either the name of a manager method or a
+        callable taking the manager as its first argument. callback(result) runs on the Tk thread.
+        Only the newest task per channel counts: older queued tasks on the same channel are
+        skipped and results from older running ones are dropped, so stale searches never land.
+        """
+        if self.closed:
+            return
+        if callable(method) and instrumentation.is_enabled():
+            # Manager methods are timed by the manager; this covers work like rendering label sheets
+            method = instrumentation.timed(f"task.{method.__name__}", method)
+        with self.lock:
+            number = next(self.task_numbers)
+            if channel is not None:
+                self.latest_by_channel[channel] = number
+        self._set_pending(self.pending + 1)
+        self.tasks.put((number, channel, method, args, kwargs, callback, on_error))
+
+    def cancel(self, channel):
+        """Drop queued and running work on a channel, for example when a search box is cleared."""
+        with self.lock:
+            self.latest_by_channel[channel] = next(self.task_numbers)
+
+    def post(self, function, *args):
+        """Run function(*args) on the Tk thread. Safe to call from the worker, e.g. for progress updates."""
+        self.results.put(("call", function, args, None, None))
+
+    def add_change_listener(self, listener):
+        """Register listener(table, action, ids) for manager changes, called on the Tk thread."""
+        self.change_listeners.append(listener)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.root.after_cancel(self.poll_id)
+        self.tasks.put(None)
+        self.thread.join(timeout=2)
+
+    def _is_stale(self, channel, number):
+        if channel is None:
+            return False
+        with self.lock:
+            return self.latest_by_channel.get(channel) != number
+
+    def _run(self):
+        manager = None
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            number, channel, method, args, kwargs, callback, on_error = task
+            if self._is_stale(channel, number):
+                self.results.put(("skipped", None, None, channel, number))
+                continue
+            try:
+                if manager is None:
+                    manager = self.manager_factory()
+                    manager.add_change_listener(self._forward_change)
+                if callable(method):
+                    result = method(manager, *args, **kwargs)
+                else:
+                    result = getattr(manager, method)(*args, **kwargs)
+            except Exception as exception:
+                self.results.put(("error", on_error, exception, channel, number))
+            else:
+                self.results.put(("done", callback, result, channel, number))
+        if manager is not None:
+            manager.close()
+
+    def _forward_change(self, table, action, ids):
+        # Called on the worker thread, so hand the change over to the Tk thread
+        self.results.put(("change", None, (table, action, ids), None, None))
+
+    def _poll(self):
+        try:
+            while True:
+                kind, handler, value, channel, number = self.results.get_nowait()
+                if kind == "change":
+                    for listener in list(self.change_listeners):
+                        listener(*value)
+                    continue
+                if kind == "call":
+                    handler(*value)
+                    continue
+                self._set_pending(self.pending - 1)
+                if kind == "skipped" or self._is_stale(channel, number):
+                    continue
+                if kind == "error":
+                    handler = handler or self.error_handler
+                    if handler:
+                        handler(value)
+                elif handler:
+                    handler(value)
+        except queue.Empty:
+            pass
+        finally:
+            if not self.closed:
+                self.poll_id = self.root.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def _set_pending(self, pending):
+        was_busy = self.pending > 0
+        self.pending = pending
+        if self.on_busy_changed and was_busy != (pending > 0):
+            self.on_busy_changed(pending > 0)
@@ -0,0 +1,211 @@
+import functools
+import math
+import operator
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+from itertools import accumulate
+
+SECONDS_PER_DAY = 86400
+MEASURES = ("buy_price", "sell_price", "profit")
+DEFAULT_PERCENTILES = (25, 50, 75, 90)
+
+
+@functools.lru_cache(maxsize=None)
+def get_numpy():
+    """
+    NumPy if it is installed, else None, imported on first use so the app starts without it.
+    Without it the same statistics run over array.array buffers in plain Python.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class SalesColumns:
+    """
+    The numeric columns of sold_cards as flat arrays, one entry per sale. Sales without a
+    sold_date are left out.
+    """
+
+    def __init__(self, buy_price, sell_price, sold_at):
+        numpy = get_numpy()
+        self.buy_price = buy_price
+        self.sell_price = sell_price
+        self.sold_at = sold_at
+        if numpy is not None:
+            # Views over the array buffers, not copies
+            self.buy_price = numpy.frombuffer(buy_price, dtype=numpy.float64)
+            self.sell_price = numpy.frombuffer(sell_price, dtype=numpy.float64)
+            self.sold_at = numpy.frombuffer(sold_at, dtype=numpy.int64)
+            self.profit = self.sell_price - self.buy_price
+        else:
+            self.profit = array("d", map(operator.sub, sell_price, buy_price))
+        self.sorted_columns = {}
+
+    def __len__(self):
+        return len(self.sold_at)
+
+    def column(self, measure):
+        if measure not in MEASURES:
+            raise ValueError(f"Unknown measure: {measure}")
+        return getattr(self, measure)
+
+    def sorted(self, measure):
+        """The column in ascending order, sorted once and kept for later percentile queries."""
+        numpy = get_numpy()
+        if measure not in self.sorted_columns:
+            values = self.column(measure)
+            self.sorted_columns[measure] = numpy.sort(values) if numpy is not None else array("d", sorted(values))
+        return self.sorted_columns[measure]
+
+    @classmethod
+    def load(cls, connection):
+        cursor = connection.cursor()
+        # Plain tuples are much cheaper to build than sqlite3.Row objects
+        cursor.row_factory = None
+        # sold_date is already Unix seconds; leaving out ORDER BY avoids a sort
+        rows = cursor.execute("""
+            SELECT COALESCE(buy_price, 0), COALESCE(sell_price, 0), sold_date
+            FROM sold_cards
+            WHERE sold_date IS NOT NULL
+        """).fetchall()
+        buy_price, sell_price, sold_at = zip(*rows) if rows else ((), (), ())
+        return cls(array("d", buy_price), array("d", sell_price), array("q", sold_at))
+
+
+class SalesReport:
+    """
+    Percentiles, moving averages and histograms over the whole sales history. The columns are
+    fetched in one query and kept until sold_cards changes, either through the manager or
+    through another connection to the same database.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.cached_columns = None
+        self.cached_version = None
+        self.cached_statistics = {}
+
+    def columns(self):
+        version = (
+            self.manager.table_versions["sold_cards"],
+            self.manager.connection.execute("PRAGMA data_version").fetchone()[0],
+        )
+        if self.cached_columns is None or version != self.cached_version:
+            self.cached_columns = SalesColumns.load(self.manager.connection)
+            self.cached_version = version
+            self.cached_statistics = {}
+        return self.cached_columns
+
+    def percentiles(self, measure, points=DEFAULT_PERCENTILES):
+        """{point: value} with linear interpolation between the closest ranks, like numpy.percentile."""
+        numpy = get_numpy()
+        values = self.columns().sorted(measure)
+        if not len(values):
+            return {point: None for point in points}
+        if numpy is not None:
+            return dict(zip(points, numpy.percentile(values, points).tolist()))
+        result = {}
+        for point in points:
+            position = (len(values) - 1) * point / 100
+            low, high = math.floor(position), math.ceil(position)
+            result[point] = values[low] + (values[high] - values[low]) * (position - low)
+        return result
+
+    def describe(self, measure, points=DEFAULT_PERCENTILES):
+        numpy = get_numpy()
+        columns = self.columns()
+        values = columns.column(measure)
+        if not len(values):
+            return {"count": 0, "mean": None, "min": None, "max": None, "percentiles": self.percentiles(measure, points)}
+        ordered = columns.sorted(measure)
+        return {
+            "count": len(values),
+            "mean": float(numpy.mean(values)) if numpy is not None else math.fsum(values) / len(values),
+            "min": float(ordered[0]),
+            "max": float(ordered[-1]),
+            "percentiles": self.percentiles(measure, points),
+        }
+
+    def daily_totals(self, measure):
+        """(first day number, totals) with one total per calendar day from the first sale to the last."""
+        numpy = get_numpy()
+        columns = self.columns()
+        if not len(columns):
+            return 0, []
+        values = columns.column(measure)
+        # Shift to local time so days break at local midnight, like the Reports tab's daily sales.
+        # The current offset is used for every sale, so days on the far side of a DST change are
+        # off by an hour at their edges.
+        offset = local_utc_offset()
+        if numpy is not None:
+            days = (columns.sold_at + offset) // SECONDS_PER_DAY
+            first = int(days.min())
+            return first, numpy.bincount(days - first, weights=values).tolist()
+        days = [(sold_at + offset) // SECONDS_PER_DAY for sold_at in columns.sold_at]
+        first = min(days)
+        totals = [0.0] * (max(days) - first + 1)
+        for day, value in zip(days, values):
+            totals[day - first] += value
+        return first, totals
+
+    def moving_average(self, measure="profit", window=7, days=None):
+        """
+        [(date, daily total, trailing average over window days)] for every day with or without
+        sales, limited to the last `days` days when given.
+        """
+        numpy = get_numpy()
+        first, totals = self.daily_totals(measure)
+        if numpy is not None:
+            running = numpy.cumsum(numpy.concatenate(([0.0], totals))).tolist()
+        else:
+            running = list(accumulate(totals, initial=0.0))
+        averages = [
+            (running[index + 1] - running[max(0, index + 1 - window)]) / min(window, index + 1)
+            for index in range(len(totals))
+        ]
+        result = [(day_label(first + index), total, average) for index, (total, average) in enumerate(zip(totals, averages))]
+        return result[-days:] if days else result
+
+    def histogram(self, measure="sell_price", bins=20):
+        """[(low edge, high edge, count)] over equal-width bins spanning the column's range."""
+        numpy = get_numpy()
+        values = self.columns().sorted(measure)
+        if not len(values):
+            return []
+        low, high = float(values[0]), float(values[-1])
+        if high == low:
+            high = low + 1
+        if numpy is not None:
+            counts, edges = numpy.histogram(values, bins=bins, range=(low, high))
+            return [(float(edges[index]), float(edges[index + 1]), int(count)) for index, count in enumerate(counts)]
+        # Edges as numpy.linspace makes them. The column is sorted, so each bin count is the
+        # distance between two binary searches; the top edge belongs to the last bin.
+        step = (high - low) / bins
+        edges = [low + index * step for index in range(bins)] + [high]
+        positions = [bisect_left(values, edge) for edge in edges[:-1]] + [len(values)]
+        return [(edges[index], edges[index + 1], positions[index + 1] - positions[index]) for index in range(bins)]
+
+    def statistics(self, window=7, days=30, bins=20):
+        """Everything the Reports tab shows about the sales distribution, kept until the sales change."""
+        self.columns()
+        key = (window, days, bins)
+        if key not in self.cached_statistics:
+            self.cached_statistics[key] = {
+                "sell_price": self.describe("sell_price"),
+                "profit": self.describe("profit"),
+                "moving_average": self.moving_average("profit", window, days),
+                "histogram": self.histogram("sell_price", bins),
+            }
+        return self.cached_statistics[key]
+
+
+def local_utc_offset():
+    return int(datetime.now().astimezone().utcoffset().total_seconds())
+
+
+def day_label(day_number):
+    return datetime.fromtimestamp(day_number * SECONDS_PER_DAY, timezone.utc).strftime("%Y-%m-%d")
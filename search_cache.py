@@ -0,0 +1,60 @@
+import string
+from collections import OrderedDict
+
+# SQLite's LIKE only ignores the case of ASCII letters, so queries and rows are folded the same way
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def fold(text):
+    return text.translate(ASCII_LOWER)
+
+
+class SearchCache:
+    """
+    Small LRU cache of search results. Every entry remembers the table version it was read at,
+    so any write to that table makes its entries misses without having to clear them.
+    A query that extends a cached query can be answered by filtering the cached rows,
+    because every substring match of the longer query also matches the shorter one.
+    Only ASCII queries are narrowed: LIKE folds ASCII case only while the trigram index folds
+    all of Unicode, so for other letters the two can disagree and only the database can tell.
+    """
+
+    def __init__(self, columns, max_entries=32, max_rows_per_entry=5000):
+        self.columns = columns
+        self.max_entries = max_entries
+        self.max_rows_per_entry = max_rows_per_entry
+        self.entries = OrderedDict()
+
+    def get(self, table, query, options, version):
+        key = (table, fold(query), options)
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def narrow(self, table, query, options, version):
+        """Filter the results of the longest cached prefix of query, or return None if there is none."""
+        if not query.isascii():
+            return None
+        folded = fold(query)
+        best = None
+        for (cached_table, cached_query, cached_options), (cached_version, rows) in self.entries.items():
+            if (cached_table == table and cached_options == options and cached_version == version
+                    and folded.startswith(cached_query) and (best is None or len(cached_query) > len(best[0]))):
+                best = (cached_query, rows)
+        if best is None:
+            return None
+        return [row for row in best[1] if self.matches(row, folded)]
+
+    def matches(self, row, folded_query):
+        return any(row[column] is not None and folded_query in fold(str(row[column])) for column in self.columns)
+
+    def put(self, table, query, options, version, rows):
+        if len(rows) > self.max_rows_per_entry:
+            return
+        key = (table, fold(query), options)
+        self.entries[key] = (version, rows)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
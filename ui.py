@@ -1,17 +1,47 @@
+import os
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from datetime import datetime
+from tkinter import ttk, messagebox, simpledialog, filedialog
+import instrumentation
+from bulk_import import import_cards
 from inventory_manager import InventoryManager
+from label_sheets import PAGE_SIZES, render_card_label_sheets
+from paged_treeview import PagedTreeview
+from query_executor import QueryExecutor
 from resource_path import resource_path
 
 class InventoryApp:
-    def __init__(self):
+    def __init__(self, search_debounce_ms=250, manager_factory=InventoryManager, fast_start=True):
         self.root = tk.Tk()
         self.root.title("Enterprise Inventory System")
         self.root.geometry("1000x800")
         self.root.resizable(True, True)
         self.root.iconbitmap(resource_path("app_icon.ico"))
 
-        self.inventory_manager = InventoryManager()
+        # All database work runs on a worker thread with its own connection,
+        # or through an inventory server when the station shares its inventory
+        self.executor = QueryExecutor(
+            self.root, manager_factory, error_handler=self.show_error, on_busy_changed=self.set_busy
+        )
+        self.executor.add_change_listener(self.on_data_changed)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+
+        # Time list refreshes and searches for the diagnostics window. Done before any widget or
+        # binding takes a reference to these methods, so every caller gets the timed version.
+        if instrumentation.is_enabled():
+            instrumentation.instrument(
+                self, "ui", names=[name for name in dir(type(self)) if name.startswith(("update_", "search_"))]
+            )
+
+        # Live search waits this long after the last keystroke before querying
+        self.search_debounce_ms = search_debounce_ms
+        self.pending_searches = {}
+        self.last_search_text = {}
+
+        # Page size the last label sheets were printed on
+        self.label_page_size = "A4"
+
+        self.create_status_bar()
 
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(expand=1, fill="both")
@@ -20,46 +50,141 @@ class InventoryApp:
         self.create_inventory_tab()
         self.create_sold_tab()
         self.create_full_inventory_tab()
+        self.create_reports_tab()
 
-        # Load initial data
-        self.update_inventory_list()
-        self.update_sold_list()
-        self.update_full_inventory()
+        if instrumentation.is_enabled():
+            # Rows reaching a list, which is where Treeview inserts happen
+            for name in ("inventory_view", "sold_view", "full_inventory_view"):
+                instrumentation.instrument(
+                    getattr(self, name), name, names=("show_rows", "upsert", "on_page_after", "on_page_before")
+                )
+
+        # Each tab's data is loaded by its tab name; Reports reload every time they are shown
+        self.tab_loaders = {
+            "Inventory": self.update_inventory_list,
+            "Sold Cards": self.update_sold_list,
+            "Full Inventory": self.update_full_inventory,
+            "Reports": self.update_reports,
+        }
+        self.loaded_tabs = set()
+
+        # Load initial data. A fast start fills only the tab on screen, so the window shows after one
+        # query instead of three; the other tabs load the first time they are opened.
+        if fast_start:
+            self.on_tab_changed()
+        else:
+            for tab_text in ("Inventory", "Sold Cards", "Full Inventory"):
+                self.loaded_tabs.add(tab_text)
+                self.tab_loaders[tab_text]()
 
         # Bind Enter key to search functions for all search entry widgets
         self.search_inventory_entry.bind("<Return>", lambda event: self.search_inventory())
         self.search_sold_entry.bind("<Return>", lambda event: self.search_sold_cards())
         self.search_full_inventory_entry.bind("<Return>", lambda event: self.search_full_inventory())
 
-        # Bind automatic barcode search for all three search bars
+        # Bind live search as you type for all three search bars
         self.search_inventory_entry.bind(
-            "<KeyRelease>", lambda event: self.auto_search_barcode(self.search_inventory_entry, self.search_inventory)
+            "<KeyRelease>", lambda event: self.schedule_live_search(self.search_inventory_entry, self.search_inventory)
         )
         self.search_sold_entry.bind(
-            "<KeyRelease>", lambda event: self.auto_search_barcode(self.search_sold_entry, self.search_sold_cards)
+            "<KeyRelease>", lambda event: self.schedule_live_search(self.search_sold_entry, self.search_sold_cards)
         )
         self.search_full_inventory_entry.bind(
-            "<KeyRelease>", lambda event: self.auto_search_barcode(self.search_full_inventory_entry, self.search_full_inventory)
+            "<KeyRelease>", lambda event: self.schedule_live_search(self.search_full_inventory_entry, self.search_full_inventory)
         )
 
         # Bind hotkey: Ctrl+R to refresh current tab
         self.root.bind('<Control-r>', self.refresh_current_tab)
 
+        # Ctrl+Z undoes this station's last change to the cards, Ctrl+Y or Ctrl+Shift+Z redoes it.
+        # In a text field the keys are left to the field.
+        self.root.bind("<Control-z>", self.undo)
+        self.root.bind("<Control-y>", self.redo)
+        self.root.bind("<Control-Z>", self.redo)
+
+        # Unloaded tabs and the reports are only read once their tab is showing
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+
+        # F12 shows latency per operation and the slow query log when instrumentation is on
+        if instrumentation.is_enabled():
+            self.root.bind("<F12>", self.open_diagnostics)
 
-    def auto_search_barcode(self, entry_widget, search_function):
+
+    def schedule_live_search(self, entry_widget, search_function):
+        """Run search_function once typing in entry_widget pauses for the debounce window."""
+        key = str(entry_widget)
         value = entry_widget.get().strip()
-        if len(value) == 12 and value.isdigit():
+        # Keys that do not change the text, like arrows and Shift, should not search again
+        if value == self.last_search_text.get(key):
+            return
+        self.last_search_text[key] = value
+
+        pending = self.pending_searches.pop(key, None)
+        if pending:
+            self.root.after_cancel(pending)
+        if self.is_barcode(value):
+            # A scanner types the whole code at once, so there is nothing to wait for
+            search_function()
+            return
+
+        def run_search():
+            self.pending_searches.pop(key, None)
             search_function()
+        self.pending_searches[key] = self.root.after(self.search_debounce_ms, run_search)
+
+    @staticmethod
+    def is_barcode(value):
+        return len(value) == 12 and value.isdigit()
+
+    def find_inventory(self, query, latest_first, callback, channel):
+        # A full UPC-A scan resolves through the barcode index instead of a text search
+        if self.is_barcode(query):
+            self.executor.submit(
+                "find_by_barcode", query, callback=lambda card: callback([card] if card else []), channel=channel
+            )
+        else:
+            self.executor.submit("search_inventory", query, latest_first=latest_first, callback=callback, channel=channel)
+
+    def find_sold_cards(self, query, callback, channel):
+        if self.is_barcode(query):
+            self.executor.submit(
+                "find_sold_by_barcode", query, callback=lambda card: callback([card] if card else []), channel=channel
+            )
+        else:
+            self.executor.submit("search_sold_cards", query, callback=callback, channel=channel)
+
+    def create_status_bar(self):
+        status_frame = ttk.Frame(self.root)
+        status_frame.pack(side="bottom", fill="x", padx=10, pady=2)
+        self.status_label = ttk.Label(status_frame, text="")
+        self.status_label.pack(side="left", padx=5)
+        self.busy_bar = ttk.Progressbar(status_frame, mode="indeterminate", length=120)
+        self.busy_bar.pack(side="right")
+
+    def set_busy(self, busy):
+        if busy:
+            self.busy_bar.start(15)
+        else:
+            self.busy_bar.stop()
+
+    def set_status(self, text):
+        self.status_label.config(text=text)
+
+    def show_error(self, error):
+        messagebox.showerror("Error", str(error))
+
+    def current_tab_text(self):
+        return self.notebook.tab(self.notebook.select(), "text")
 
     def refresh_current_tab(self, event=None):
-        current_tab = self.notebook.select()
-        tab_text = self.notebook.tab(current_tab, "text")
-        if tab_text == "Inventory":
-            self.update_inventory_list()
-        elif tab_text == "Sold Cards":
-            self.update_sold_list()
-        elif tab_text == "Full Inventory":
-            self.update_full_inventory()
+        tab_text = self.current_tab_text()
+        self.loaded_tabs.add(tab_text)
+        self.tab_loaders[tab_text]()
+
+    def on_tab_changed(self, event=None):
+        tab_text = self.current_tab_text()
+        if tab_text == "Reports" or tab_text not in self.loaded_tabs:
+            self.refresh_current_tab()
 
     def create_inventory_tab(self):
         inventory_frame = ttk.Frame(self.notebook)
@@ -86,8 +211,10 @@ class InventoryApp:
         self.name_entry.grid(row=0, column=1, padx=5, pady=5)
 
         ttk.Label(form_frame, text="Condition:").grid(row=1, column=0, padx=5, pady=5)
-        self.condition_entry = ttk.Entry(form_frame)
+        # Known conditions to pick from; a new one can still be typed in
+        self.condition_entry = ttk.Combobox(form_frame)
         self.condition_entry.grid(row=1, column=1, padx=5, pady=5)
+        self.update_conditions()
 
         ttk.Label(form_frame, text="Card Number:").grid(row=2, column=0, padx=5, pady=5)
         self.card_number_entry = ttk.Entry(form_frame)
@@ -105,6 +232,14 @@ class InventoryApp:
         ttk.Button(button_frame, text="Edit", command=self.edit_card).pack(fill="x", pady=5)
         ttk.Button(button_frame, text="Delete", command=self.delete_card).pack(fill="x", pady=5)
         ttk.Button(button_frame, text="Sell", command=self.sell_card).pack(fill="x", pady=5)
+        ttk.Button(button_frame, text="Set Price...", command=lambda: self.set_selected_buy_price(self.inventory_tree)).pack(fill="x", pady=5)
+        ttk.Button(
+            button_frame, text="Markdown...",
+            command=lambda: self.markdown_cards(self.inventory_tree, self.search_inventory_entry)
+        ).pack(fill="x", pady=5)
+        ttk.Button(button_frame, text="Label", command=lambda: self.show_label(self.inventory_tree)).pack(fill="x", pady=5)
+        ttk.Button(button_frame, text="Label Sheet...", command=self.print_label_sheets).pack(fill="x", pady=5)
+        ttk.Button(button_frame, text="Import...", command=self.import_inventory).pack(fill="x", pady=5)
 
         # --- Treeview for Current Inventory with Vertical Scrollbar only ---
         list_frame = ttk.LabelFrame(inventory_frame, text="Recent Entries", padding=10)
@@ -114,9 +249,16 @@ class InventoryApp:
         tree_frame = ttk.Frame(list_frame)
         tree_frame.pack(fill="both", expand=True, padx=5, pady=5)
 
-        self.inventory_tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=20)
+        self.inventory_tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=20, selectmode="extended")
         vsb_inventory = ttk.Scrollbar(tree_frame, orient="vertical", command=self.inventory_tree.yview)
-        self.inventory_tree.configure(yscrollcommand=vsb_inventory.set)
+        self.inventory_view = PagedTreeview(
+            self.inventory_tree, vsb_inventory,
+            lambda anchor_id, limit, backwards, callback: self.executor.submit(
+                "get_inventory_page", anchor_id, limit, latest_first=True, backwards=backwards, callback=callback
+            ),
+            self.inventory_values,
+            descending=True
+        )
         self.inventory_tree.pack(side="left", fill="both", expand=True)
         vsb_inventory.pack(side="right", fill="y")
 
@@ -152,9 +294,15 @@ class InventoryApp:
         tree_frame = ttk.Frame(sold_frame)
         tree_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
-        self.sold_tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=20)
+        self.sold_tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=20, selectmode="extended")
         vsb_sold = ttk.Scrollbar(tree_frame, orient="vertical", command=self.sold_tree.yview)
-        self.sold_tree.configure(yscrollcommand=vsb_sold.set)
+        self.sold_view = PagedTreeview(
+            self.sold_tree, vsb_sold,
+            lambda anchor_id, limit, backwards, callback: self.executor.submit(
+                "get_sold_cards_page", anchor_id, limit, backwards=backwards, callback=callback
+            ),
+            self.sold_values
+        )
         self.sold_tree.pack(side="left", fill="both", expand=True)
         vsb_sold.pack(side="right", fill="y")
 
@@ -201,9 +349,15 @@ class InventoryApp:
         tree_frame = ttk.Frame(full_inventory_frame)
         tree_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
-        self.full_inventory_tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=20)
+        self.full_inventory_tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=20, selectmode="extended")
         vsb_full = ttk.Scrollbar(tree_frame, orient="vertical", command=self.full_inventory_tree.yview)
-        self.full_inventory_tree.configure(yscrollcommand=vsb_full.set)
+        self.full_inventory_view = PagedTreeview(
+            self.full_inventory_tree, vsb_full,
+            lambda anchor_id, limit, backwards, callback: self.executor.submit(
+                "get_inventory_page", anchor_id, limit, backwards=backwards, callback=callback
+            ),
+            self.inventory_values
+        )
         self.full_inventory_tree.pack(side="left", fill="both", expand=True)
         vsb_full.pack(side="right", fill="y")
 
@@ -227,18 +381,149 @@ class InventoryApp:
         ttk.Button(button_frame, text="Sell Card", command=self.sell_selected_card_full_inventory).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Edit Card", command=self.edit_selected_card_full_inventory).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Delete Card", command=self.delete_selected_card_full_inventory).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Set Price...", command=lambda: self.set_selected_buy_price(self.full_inventory_tree)).pack(side="left", padx=5)
+        ttk.Button(
+            button_frame, text="Markdown...",
+            command=lambda: self.markdown_cards(self.full_inventory_tree, self.search_full_inventory_entry)
+        ).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Label", command=lambda: self.show_label(self.full_inventory_tree)).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Refresh", command=self.update_full_inventory).pack(side="left", padx=5)
 
+    def create_reports_tab(self):
+        reports_frame = ttk.Frame(self.notebook)
+        self.notebook.add(reports_frame, text="Reports")
+
+        ttk.Label(reports_frame, text="Reports", font=("Helvetica", 16, "bold")).pack(pady=10)
+
+        # Headline numbers
+        summary_frame = ttk.LabelFrame(reports_frame, text="Summary", padding=10)
+        summary_frame.pack(fill="x", padx=20, pady=5)
+        self.report_labels = {}
+        summary_fields = (
+            "Cards in Stock", "Inventory Cost", "Cards Sold", "Revenue", "Profit", "Margin", "Avg Days to Sell"
+        )
+        for column, field in enumerate(summary_fields):
+            ttk.Label(summary_frame, text=field).grid(row=0, column=column, padx=10)
+            self.report_labels[field] = ttk.Label(summary_frame, text="-", font=("Helvetica", 12, "bold"))
+            self.report_labels[field].grid(row=1, column=column, padx=10)
+
+        # Spread of sale prices and profits over the whole history
+        statistics_frame = ttk.LabelFrame(reports_frame, text="Distribution", padding=10)
+        statistics_frame.pack(fill="x", padx=20, pady=5)
+        self.statistics_labels = {}
+        for column, heading in enumerate(("", "Mean", "25%", "Median", "75%", "90%", "7-Day Avg Profit"), start=0):
+            ttk.Label(statistics_frame, text=heading).grid(row=0, column=column, padx=10)
+        for row, measure in enumerate(("sell_price", "profit"), start=1):
+            ttk.Label(statistics_frame, text="Sale Price" if measure == "sell_price" else "Profit").grid(
+                row=row, column=0, padx=10, sticky="w"
+            )
+            for column, key in enumerate(("mean", 25, 50, 75, 90), start=1):
+                self.statistics_labels[measure, key] = ttk.Label(statistics_frame, text="-")
+                self.statistics_labels[measure, key].grid(row=row, column=column, padx=10)
+        self.statistics_labels["moving_average"] = ttk.Label(statistics_frame, text="-")
+        self.statistics_labels["moving_average"].grid(row=1, column=6, rowspan=2, padx=10)
+
+        # Sales per day, week or month
+        sales_frame = ttk.LabelFrame(reports_frame, text="Sales", padding=10)
+        sales_frame.pack(fill="both", expand=True, padx=20, pady=5)
+        controls = ttk.Frame(sales_frame)
+        controls.pack(fill="x")
+        ttk.Label(controls, text="Group by:").pack(side="left", padx=5)
+        self.report_period = ttk.Combobox(controls, values=("day", "week", "month"), state="readonly", width=10)
+        self.report_period.set("day")
+        self.report_period.pack(side="left", padx=5)
+        self.report_period.bind("<<ComboboxSelected>>", lambda event: self.show_sales_report())
+        ttk.Button(controls, text="Refresh", command=self.update_reports).pack(side="left", padx=5)
+
+        sales_columns = ("Period", "Cards Sold", "Revenue", "Cost", "Profit", "Avg Days to Sell")
+        self.sales_report_tree = ttk.Treeview(sales_frame, columns=sales_columns, show="headings", height=8)
+        for col in sales_columns:
+            self.sales_report_tree.heading(col, text=col)
+            self.sales_report_tree.column(col, width=120, anchor="center")
+        self.sales_report_tree.pack(fill="both", expand=True, pady=5)
+
+        # Margin per card name and condition
+        margins_frame = ttk.LabelFrame(reports_frame, text="Most Profitable Cards", padding=10)
+        margins_frame.pack(fill="both", expand=True, padx=20, pady=5)
+        margin_columns = ("Name", "Condition", "Cards Sold", "Revenue", "Profit", "Margin", "Avg Days to Sell")
+        self.margin_report_tree = ttk.Treeview(margins_frame, columns=margin_columns, show="headings", height=8)
+        for col in margin_columns:
+            self.margin_report_tree.heading(col, text=col)
+            self.margin_report_tree.column(col, width=110, anchor="center")
+        self.margin_report_tree.pack(fill="both", expand=True)
+
+        self.dashboard = None
+
+    def update_reports(self):
+        self.executor.submit("get_dashboard", callback=self.show_dashboard, channel="reports")
+        self.executor.submit("get_sales_statistics", callback=self.show_sales_statistics, channel="report_statistics")
+
+    def show_sales_statistics(self, statistics):
+        for measure in ("sell_price", "profit"):
+            summary = statistics[measure]
+            # Percentile keys arrive as strings from an inventory server, since JSON keys are strings
+            values = {int(point): value for point, value in summary["percentiles"].items()}
+            values["mean"] = summary["mean"]
+            for key, value in values.items():
+                self.statistics_labels[measure, key].config(text="-" if value is None else f"{value:.2f}")
+        moving_average = statistics["moving_average"]
+        self.statistics_labels["moving_average"].config(
+            text=f"{moving_average[-1][2]:.2f}" if moving_average else "-"
+        )
+
+    def show_dashboard(self, dashboard):
+        self.dashboard = dashboard
+        inventory = dashboard["inventory"]
+        totals = dashboard["totals"]
+        values = {
+            "Cards in Stock": inventory["card_count"],
+            "Inventory Cost": f"{inventory['total_cost']:.2f}",
+            "Cards Sold": totals["cards_sold"],
+            "Revenue": f"{totals['revenue']:.2f}",
+            "Profit": f"{totals['profit']:.2f}",
+            "Margin": self.format_percent(totals["margin"]),
+            "Avg Days to Sell": self.format_days(totals["average_days_to_sell"]),
+        }
+        for field, value in values.items():
+            self.report_labels[field].config(text=value)
+
+        self.show_sales_report()
+        self.margin_report_tree.delete(*self.margin_report_tree.get_children())
+        for row in dashboard["margins"]:
+            self.margin_report_tree.insert("", "end", values=(
+                row["name"], row["condition"], row["cards_sold"], f"{row['revenue']:.2f}", f"{row['profit']:.2f}",
+                self.format_percent(row["margin"]), self.format_days(row["average_days_to_sell"])
+            ))
+
+    def show_sales_report(self):
+        if self.dashboard is None:
+            return
+        self.sales_report_tree.delete(*self.sales_report_tree.get_children())
+        for row in self.dashboard[self.report_period.get()]:
+            self.sales_report_tree.insert("", "end", values=(
+                row["bucket"], row["cards_sold"], f"{row['revenue']:.2f}", f"{row['cost']:.2f}",
+                f"{row['profit']:.2f}", self.format_days(row["average_days_to_sell"])
+            ))
+
+    @staticmethod
+    def format_percent(value):
+        return "-" if value is None else f"{value:.1%}"
+
+    @staticmethod
+    def format_days(value):
+        return "-" if value is None else f"{value:.1f}"
+
     def search_full_inventory(self):
         query = self.search_full_inventory_entry.get().strip()
-        results = self.inventory_manager.search_inventory(query, latest_first=False)
-        for item in self.full_inventory_tree.get_children():
-            self.full_inventory_tree.delete(item)
-        for card in results:
-            self.full_inventory_tree.insert(
-                "", "end", values=(card["id"], card["name"], card["condition"], card["card_number"], card["buy_price"],
-                                   card["barcode"])
-            )
+        if not query:
+            self.update_full_inventory()
+            return
+        self.full_inventory_view.show_results(
+            lambda callback: self.find_inventory(query, False, callback, channel="search_full_inventory")
+        )
+
+    def update_conditions(self):
+        self.executor.submit("get_conditions", callback=lambda names: self.condition_entry.config(values=names))
 
     def add_inventory_item(self):
         name = self.name_entry.get().strip()
@@ -256,26 +541,155 @@ class InventoryApp:
             messagebox.showerror("Error", "Buy Price must be a valid number!")
             return
 
-        self.inventory_manager.add_card(name, condition, card_number, buy_price)
-        self.update_inventory_list()
-        self.update_full_inventory()
+        def on_added(card_id):
+            self.name_entry.delete(0, tk.END)
+            self.condition_entry.delete(0, tk.END)
+            self.card_number_entry.delete(0, tk.END)
+            self.buy_price_entry.delete(0, tk.END)
+            self.update_conditions()
+
+            # Check if the card name contains "Blastoise"
+            if "Blastoise" in name:
+                self.prank()
+
+        self.executor.submit("add_card", name, condition, card_number, buy_price, callback=on_added)
+
+    def import_inventory(self):
+        path = filedialog.askopenfilename(
+            title="Import Cards",
+            filetypes=[("Card files", "*.csv *.json *.jsonl"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+
+        def import_progress(rows_read, imported):
+            self.executor.post(self.set_status, f"Importing... {imported} of {rows_read} rows added")
+
+        def on_imported(report):
+            self.set_status("")
+            messagebox.showinfo("Import Complete", report.summary())
+
+        self.executor.submit(import_cards, path, progress=import_progress, callback=on_imported)
+
+    def show_label(self, tree):
+        selected_item = tree.selection()
+        if not selected_item:
+            messagebox.showerror("Error", "No card selected!")
+            return
+
+        card_id = tree.item(selected_item[0], "values")[0]
+        self.executor.submit("get_label_path", card_id, callback=self.open_label_window)
+
+    def open_label_window(self, label_path):
+        from PIL import Image, ImageTk
+
+        if label_path is None:
+            messagebox.showerror("Error", "That card no longer exists!")
+            return
+
+        label_window = tk.Toplevel(self.root)
+        label_window.title("Label")
+
+        with Image.open(label_path) as image:
+            label_image = ImageTk.PhotoImage(image)
+        ttk.Label(label_window, image=label_image).pack(padx=10, pady=10)
+        ttk.Button(label_window, text="Print", command=lambda: self.print_label(label_path)).pack(pady=5)
+
+        # Keep a reference to the image to prevent garbage collection
+        label_window.label_image = label_image
+
+    def print_label(self, label_path):
+        if hasattr(os, "startfile"):
+            # Hands the file to the default Windows print handler for PNG images
+            os.startfile(label_path, "print")
+        else:
+            messagebox.showinfo("Print Label", f"Label saved to {label_path}")
+
+    def print_label_sheets(self):
+        # Ctrl/Shift-click selects several cards; every selected card gets a label
+        selected_items = self.inventory_tree.selection()
+        if not selected_items:
+            messagebox.showerror("Error", "No items selected!")
+            return
+
+        card_ids = [self.inventory_tree.item(item, "values")[0] for item in selected_items]
+
+        sheet_window = tk.Toplevel(self.root)
+        sheet_window.title("Label Sheets")
+        sheet_window.resizable(False, False)
+
+        ttk.Label(sheet_window, text=f"Labels for {len(card_ids)} card(s)").grid(row=0, column=0, columnspan=2, padx=5, pady=5)
+        ttk.Label(sheet_window, text="Page Size:").grid(row=1, column=0, padx=5, pady=5)
+        page_size_entry = ttk.Combobox(sheet_window, values=list(PAGE_SIZES), state="readonly")
+        page_size_entry.set(self.label_page_size)
+        page_size_entry.grid(row=1, column=1, padx=5, pady=5)
+
+        def save_sheets():
+            page_size = page_size_entry.get()
+            sheet_window.destroy()
+            self.save_label_sheets(card_ids, page_size)
+
+        ttk.Button(sheet_window, text="Save...", command=save_sheets).grid(row=2, column=0, columnspan=2, pady=10)
+
+    def save_label_sheets(self, card_ids, page_size):
+        self.label_page_size = page_size
+        output_path = filedialog.asksaveasfilename(
+            title="Save Label Sheets",
+            defaultextension=".pdf",
+            filetypes=[("PDF document", "*.pdf"), ("PNG images", "*.png")]
+        )
+        if not output_path:
+            return
+
+        def progress(labels_done):
+            self.executor.post(self.set_status, f"Rendering labels... {labels_done} of {len(card_ids)}")
+
+        def on_rendered(paths):
+            self.set_status("")
+            messagebox.showinfo(
+                "Label Sheets", f"Saved {len(card_ids)} labels to {len(paths)} file(s):\n{paths[0] if paths else ''}"
+            )
+            if paths and hasattr(os, "startfile"):
+                os.startfile(paths[0])
+
+        self.executor.submit(
+            render_card_label_sheets, card_ids, output_path, page_size=page_size, progress=progress, callback=on_rendered
+        )
+
+    def prank(self):
+        from PIL import Image, ImageTk
+
+        # Create a window to display the PNG
+        prank_window = tk.Toplevel(self.root)
+        prank_window.title("Surprise!")
+        prank_window.geometry("1920x1080")  # You can adjust size as needed
+        prank_window.overrideredirect(True)  # Remove window decorations
+
+        # Use resource_path to find the image wherever the app is run
+        img_path = resource_path("Zach.jpg")  # or "Zach.jpg" if you keep JPG
+
+        img = Image.open(img_path)
+        img = img.resize((1920, 1080))  # Resize the image to fit the window
+
+        img_tk = ImageTk.PhotoImage(img)
+
+        label = tk.Label(prank_window, image=img_tk)
+        label.pack(expand=True, fill="both")
 
-        self.name_entry.delete(0, tk.END)
-        self.condition_entry.delete(0, tk.END)
-        self.card_number_entry.delete(0, tk.END)
-        self.buy_price_entry.delete(0, tk.END)
+        # Automatically close the window after 0.5 seconds
+        prank_window.after(500, prank_window.destroy)  # 500 ms = 0.5 seconds
+
+        # Keep a reference to the image to prevent garbage collection
+        prank_window.img_tk = img_tk
 
     def search_inventory(self):
         query = self.search_inventory_entry.get().strip()
-        results = self.inventory_manager.search_inventory(query, latest_first=True)
-        for item in self.inventory_tree.get_children():
-            self.inventory_tree.delete(item)
-        for card in results:
-            self.inventory_tree.insert(
-                "", "end", values=(
-                    card["id"], card["name"], card["condition"], card["card_number"], card["buy_price"], card["barcode"]
-                )
-            )
+        if not query:
+            self.update_inventory_list()
+            return
+        self.inventory_view.show_results(
+            lambda callback: self.find_inventory(query, True, callback, channel="search_inventory")
+        )
 
     def edit_card(self):
         selected_item = self.inventory_tree.selection()
@@ -284,7 +698,12 @@ class InventoryApp:
             return
 
         card_id = self.inventory_tree.item(selected_item[0], "values")[0]
-        card = self.inventory_manager.get_card_by_id(card_id)
+        self.executor.submit("get_card_by_id", card_id, callback=lambda card: self.open_edit_card_window(card_id, card))
+
+    def open_edit_card_window(self, card_id, card):
+        if card is None:
+            messagebox.showerror("Error", "That card no longer exists!")
+            return
 
         edit_window = tk.Toplevel(self.root)
         edit_window.title("Edit Card")
@@ -323,10 +742,8 @@ class InventoryApp:
             except ValueError:
                 messagebox.showerror("Error", "Buy Price must be a valid number!")
                 return
-            self.inventory_manager.edit_card(card_id, new_name, new_condition, new_card_number, new_buy_price)
+            self.executor.submit("edit_card", card_id, new_name, new_condition, new_card_number, new_buy_price)
             edit_window.destroy()
-            self.update_inventory_list()
-            self.update_full_inventory()
 
         ttk.Button(edit_window, text="Save", command=save_changes).grid(row=4, column=0, columnspan=2, pady=10)
 
@@ -337,7 +754,14 @@ class InventoryApp:
             return
 
         card_id = self.full_inventory_tree.item(selected_item[0], "values")[0]
-        card = self.inventory_manager.get_card_by_id(card_id)
+        self.executor.submit(
+            "get_card_by_id", card_id, callback=lambda card: self.open_edit_full_inventory_window(card_id, card)
+        )
+
+    def open_edit_full_inventory_window(self, card_id, card):
+        if card is None:
+            messagebox.showerror("Error", "That card no longer exists!")
+            return
 
         edit_window = tk.Toplevel(self.root)
         edit_window.title("Edit Card")
@@ -380,9 +804,8 @@ class InventoryApp:
                 messagebox.showerror("Error", "Buy Price must be a valid number!")
                 return
 
-            self.inventory_manager.edit_card(card_id, new_name, new_condition, new_card_number, new_buy_price)
+            self.executor.submit("edit_card", card_id, new_name, new_condition, new_card_number, new_buy_price)
             edit_window.destroy()
-            self.update_full_inventory()
 
         ttk.Button(edit_window, text="Save", command=save_changes).grid(row=4, column=0, columnspan=2, pady=10)
 
@@ -393,7 +816,14 @@ class InventoryApp:
             return
 
         card_id = self.sold_tree.item(selected_item[0], "values")[0]
-        card = self.inventory_manager.get_sold_card_by_id(card_id)
+        self.executor.submit(
+            "get_sold_card_by_id", card_id, callback=lambda card: self.open_edit_sold_card_window(card_id, card)
+        )
+
+    def open_edit_sold_card_window(self, card_id, card):
+        if card is None:
+            messagebox.showerror("Error", "That card no longer exists!")
+            return
 
         edit_window = tk.Toplevel(self.root)
         edit_window.title("Edit Sold Card")
@@ -443,134 +873,270 @@ class InventoryApp:
                 messagebox.showerror("Error", "Buy Price and Sell Price must be valid numbers!")
                 return
 
-            self.inventory_manager.edit_sold_card(card_id, new_name, new_condition, new_card_number, new_buy_price,
-                                                  new_sell_price)
+            self.executor.submit("edit_sold_card", card_id, new_name, new_condition, new_card_number, new_buy_price,
+                                 new_sell_price)
             edit_window.destroy()
-            self.update_sold_list()
 
         ttk.Button(edit_window, text="Save", command=save_changes).grid(row=5, column=0, columnspan=2, pady=10)
 
     def delete_sold_card(self):
-        selected_item = self.sold_tree.selection()
-        if not selected_item:
+        card_ids = self.selected_card_ids(self.sold_tree)
+        if not card_ids:
             messagebox.showerror("Error", "No card selected!")
             return
 
-        card_id = self.sold_tree.item(selected_item[0], "values")[0]
+        what = "this sold card" if len(card_ids) == 1 else f"these {len(card_ids)} sold cards"
         confirm = messagebox.askyesno("Confirm Deletion",
-                                      "Are you sure you want to delete this sold card? This action cannot be undone.")
+                                      f"Are you sure you want to delete {what}? You can undo this with Ctrl+Z.")
         if confirm:
-            self.inventory_manager.delete_sold_item(card_id)
-            self.update_sold_list()
+            self.executor.submit("delete_sold_items", card_ids)
 
     def delete_card(self):
-        selected_item = self.inventory_tree.selection()
-        if not selected_item:
+        self.delete_selected_cards(self.inventory_tree)
+
+    def delete_selected_cards(self, tree):
+        card_ids = self.selected_card_ids(tree)
+        if not card_ids:
             messagebox.showerror("Error", "No item selected!")
             return
 
-        card_id = self.inventory_tree.item(selected_item[0], "values")[0]
-        confirm = messagebox.askyesno("Confirm Deletion", "Are you sure you want to delete this item?")
+        what = "this item" if len(card_ids) == 1 else f"these {len(card_ids)} items"
+        confirm = messagebox.askyesno(
+            "Confirm Deletion", f"Are you sure you want to delete {what}? You can undo this with Ctrl+Z."
+        )
         if confirm:
-            self.inventory_manager.delete_inventory_item(card_id)
-            self.update_inventory_list()
-            self.update_full_inventory()
+            # One statement and one change notification, however many rows are selected
+            self.executor.submit("delete_inventory_items", card_ids)
 
-    def sell_card(self):
-        selected_item = self.inventory_tree.selection()
-        if not selected_item:
-            messagebox.showerror("Error", "No item selected!")
+    @staticmethod
+    def selected_card_ids(tree):
+        """Ids of every selected row; Ctrl/Shift-click selects several."""
+        return [int(tree.item(item, "values")[0]) for item in tree.selection()]
+
+    def set_selected_buy_price(self, tree):
+        card_ids = self.selected_card_ids(tree)
+        if not card_ids:
+            messagebox.showerror("Error", "No card selected!")
             return
 
-        card_id = self.inventory_tree.item(selected_item[0], "values")[0]
-        sell_price = simpledialog.askfloat("Sell Card", "Enter sale price:")
+        buy_price = simpledialog.askfloat("Set Buy Price", f"New buy price for {len(card_ids)} card(s):", minvalue=0)
+        if buy_price is None:
+            return
+        self.executor.submit("set_buy_price", card_ids, buy_price)
+
+    def markdown_cards(self, tree, search_entry):
+        """Mark down the selected cards, or every card matching the tab's search when none are selected."""
+        card_ids = self.selected_card_ids(tree)
+        query = search_entry.get().strip()
+        if card_ids:
+            target = f"{len(card_ids)} selected card(s)"
+        elif query:
+            target = f'every card matching "{query}"'
+        else:
+            messagebox.showerror("Error", "Select cards or search for the cards to mark down!")
+            return
 
-        if sell_price is None:
+        percent = simpledialog.askfloat(
+            "Markdown", f"Lower the buy price of {target} by what percent?", minvalue=0, maxvalue=100
+        )
+        if percent is None:
             return
 
-        self.inventory_manager.sell_card(card_id, sell_price)
-        self.update_inventory_list()
-        self.update_full_inventory()
-        self.update_sold_list()
+        def on_marked_down(card_ids):
+            self.set_status(f"Marked down {len(card_ids)} card(s) by {percent:g}%")
 
-    def delete_selected_card_full_inventory(self):
-        selected_item = self.full_inventory_tree.selection()
-        if not selected_item:
-            messagebox.showerror("Error", "No card selected!")
-            return
+        if card_ids:
+            self.executor.submit("markdown_buy_prices", percent, card_ids=card_ids, callback=on_marked_down)
+        else:
+            self.executor.submit("markdown_buy_prices", percent, query=query, callback=on_marked_down)
 
-        card_id = self.full_inventory_tree.item(selected_item[0], "values")[0]
-        confirm = messagebox.askyesno("Confirm Deletion", "Are you sure you want to delete this item?")
-        if confirm:
-            self.inventory_manager.delete_inventory_item(card_id)
-            self.update_full_inventory()
+    def sell_card(self):
+        self.sell_selected_cards(self.inventory_tree)
+
+    def delete_selected_card_full_inventory(self):
+        self.delete_selected_cards(self.full_inventory_tree)
 
     def sell_selected_card_full_inventory(self):
-        selected_item = self.full_inventory_tree.selection()
-        if not selected_item:
+        self.sell_selected_cards(self.full_inventory_tree)
+
+    def sell_selected_cards(self, tree):
+        # Ctrl/Shift-click selects several cards, which are sold together as one sale
+        card_ids = self.selected_card_ids(tree)
+        if not card_ids:
             messagebox.showerror("Error", "No card selected!")
             return
 
-        card_id = self.full_inventory_tree.item(selected_item[0], "values")[0]
-        sell_price = simpledialog.askfloat("Sell Card", "Enter selling price:")
+        if len(card_ids) == 1:
+            sell_price = simpledialog.askfloat("Sell Card", "Enter sale price:", minvalue=0)
+        else:
+            sell_price = simpledialog.askfloat(
+                "Sell Cards", f"Enter total sale price for {len(card_ids)} cards:\n"
+                              "(split across the cards by buy price)",
+                minvalue=0
+            )
         if sell_price is None:
             return
 
-        self.inventory_manager.sell_card(card_id, sell_price)
-        self.update_full_inventory()
+        def on_sold(sale_id):
+            if sale_id is not None and len(card_ids) > 1:
+                self.set_status(f"Sale #{sale_id}: {len(card_ids)} cards sold for {sell_price:.2f}")
+
+        self.executor.submit("checkout", card_ids, sell_price, callback=on_sold)
+
+    def undo(self, event=None):
+        return self.replay_action("undo", "Undo", "Undid", event)
+
+    def redo(self, event=None):
+        return self.replay_action("redo", "Redo", "Redid", event)
+
+    def replay_action(self, method, verb, done, event=None):
+        """Ask before undoing or redoing this station's next action, naming it."""
+        if event is not None and isinstance(event.widget, (tk.Entry, tk.Spinbox, tk.Text)):
+            # Typing in a field: the keys edit its text, not the database
+            return None
+
+        def confirm(action):
+            if action is None:
+                self.set_status(f"Nothing to {method}")
+                return
+            if not messagebox.askyesno(verb, f"{verb} {action['description']}?"):
+                return
+            # Only that action is replayed, even if the history moved on while the dialog was open;
+            # the lists update from the change notifications, like after any other edit
+            self.executor.submit(
+                method, action["id"], callback=lambda description: self.set_status(f"{done}: {description}")
+            )
+
+        self.executor.submit(f"get_next_{method}", callback=confirm)
+        return "break"
 
     def search_sold_cards(self):
         query = self.search_sold_entry.get().strip()
-        results = self.inventory_manager.search_sold_cards(query)
-        for item in self.sold_tree.get_children():
-            self.sold_tree.delete(item)
-        for card in results:
-            self.sold_tree.insert(
-                "", "end", values=(
-                    card["id"], card["name"], card["condition"], card["card_number"], card["buy_price"],
-                    card["sell_price"], card["sold_date"], card["barcode"]
-                )
-            )
+        if not query:
+            self.update_sold_list()
+            return
+        self.sold_view.show_results(
+            lambda callback: self.find_sold_cards(query, callback, channel="search_sold_cards")
+        )
+
+    def on_data_changed(self, table, action, ids):
+        """Apply a committed change to the affected list views only, keyed by card id."""
+        if self.current_tab_text() == "Reports":
+            self.update_reports()
+
+        # Views of tabs that were never opened hold no rows, so upserts and removals skip them
+        if table == "inventory":
+            views = (self.inventory_view, self.full_inventory_view)
+        else:
+            views = (self.sold_view,)
+
+        if action == "delete":
+            for view in views:
+                view.remove(ids)
+            return
+
+        # "reload" comes from a shared inventory whose change feed could not be replayed
+        if action == "reload" or len(ids) > views[0].max_rows:
+            # More rows than a whole window: reloading one page is cheaper than placing each row
+            for view in views:
+                if view.paging:
+                    view.reset()
+            return
+
+        def apply(rows):
+            for view in views:
+                view.upsert(rows)
+
+        method = "get_cards_by_ids" if table == "inventory" else "get_sold_cards_by_ids"
+        self.executor.submit(method, ids, callback=apply)
 
     def update_inventory_list(self):
-        for item in self.inventory_tree.get_children():
-            self.inventory_tree.delete(item)
-        inventory = self.inventory_manager.get_inventory_latest_first()
-        for card in inventory:
-            self.inventory_tree.insert(
-                "", "end", values=(
-                    card["id"], card["name"], card["condition"], card["card_number"], card["buy_price"], card["barcode"]
-                )
-            )
+        self.inventory_view.reset()
 
     def update_full_inventory(self):
-        for item in self.full_inventory_tree.get_children():
-            self.full_inventory_tree.delete(item)
-        inventory = self.inventory_manager.get_inventory()
-        for card in inventory:
-            self.full_inventory_tree.insert(
-                "", "end", values=(
-                    card["id"], card["name"], card["condition"], card["card_number"], card["buy_price"],
-                    card["barcode"])
-            )
+        self.full_inventory_view.reset()
 
     def update_sold_list(self):
-        sold_cards = self.inventory_manager.get_sold_cards()
-        for item in self.sold_tree.get_children():
-            self.sold_tree.delete(item)
-        for card in sold_cards:
-            self.sold_tree.insert(
-                "", "end", values=(
-                    card["id"],
-                    card["name"],
-                    card["condition"],
-                    card["card_number"],
-                    card["buy_price"],
-                    card["sell_price"],
-                    card["sold_date"],
-                    card["barcode"]
-                )
-            )
+        self.sold_view.reset()
+
+    @staticmethod
+    def inventory_values(card):
+        return card["id"], card["name"], card["condition"], card["card_number"], card["buy_price"], card["barcode"]
+
+    @staticmethod
+    def sold_values(card):
+        return (
+            card["id"],
+            card["name"],
+            card["condition"],
+            card["card_number"],
+            card["buy_price"],
+            card["sell_price"],
+            InventoryApp.format_timestamp(card["sold_date"]),
+            card["barcode"]
+        )
+
+    @staticmethod
+    def format_timestamp(timestamp):
+        """Show a stored Unix timestamp in local time, as dates were shown before they became integers."""
+        if timestamp is None:
+            return ""
+        return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+    def open_diagnostics(self, event=None):
+        diagnostics_window = tk.Toplevel(self.root)
+        diagnostics_window.title("Diagnostics")
+        diagnostics_window.geometry("900x600")
+
+        operations_frame = ttk.LabelFrame(diagnostics_window, text="Operations", padding=10)
+        operations_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        columns = ("Operation", "Calls", "p50 ms", "p95 ms", "Max ms", "Total ms")
+        operations_tree = ttk.Treeview(operations_frame, columns=columns, show="headings", height=14)
+        for col in columns:
+            operations_tree.heading(col, text=col)
+            operations_tree.column(col, width=380 if col == "Operation" else 80, anchor="w" if col == "Operation" else "e")
+        operations_scrollbar = ttk.Scrollbar(operations_frame, orient="vertical", command=operations_tree.yview)
+        operations_tree.configure(yscrollcommand=operations_scrollbar.set)
+        operations_tree.pack(side="left", fill="both", expand=True)
+        operations_scrollbar.pack(side="right", fill="y")
+
+        slow_frame = ttk.LabelFrame(diagnostics_window, text="Slow Queries", padding=10)
+        slow_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        slow_text = tk.Text(slow_frame, height=10, wrap="word")
+        slow_text.pack(fill="both", expand=True)
+
+        button_frame = ttk.Frame(diagnostics_window)
+        button_frame.pack(fill="x", padx=10, pady=5)
+
+        def refresh():
+            operations_tree.delete(*operations_tree.get_children())
+            for row in instrumentation.summary():
+                operations_tree.insert("", "end", values=(
+                    row["name"], row["calls"], f"{row['p50_ms']:.2f}", f"{row['p95_ms']:.2f}",
+                    f"{row['max_ms']:.2f}", f"{row['total_ms']:.1f}"
+                ))
+            slow_text.delete("1.0", tk.END)
+            for query in reversed(instrumentation.slow_queries()):
+                slow_text.insert(tk.END, f"{self.format_timestamp(int(query['time']))}  {query['ms']:.1f} ms\n{query['sql']}\n")
+                for step in query["plan"]:
+                    slow_text.insert(tk.END, f"    {step}\n")
+                slow_text.insert(tk.END, "\n")
+
+        def refresh_periodically():
+            refresh()
+            diagnostics_window.refresh_id = diagnostics_window.after(1000, refresh_periodically)
+
+        def reset():
+            instrumentation.reset()
+            refresh()
+
+        def close():
+            diagnostics_window.after_cancel(diagnostics_window.refresh_id)
+            diagnostics_window.destroy()
+
+        ttk.Button(button_frame, text="Reset", command=reset).pack(side="right", padx=5)
+        diagnostics_window.protocol("WM_DELETE_WINDOW", close)
+        refresh_periodically()
 
     def get_selected_card_id(self, listbox, index):
         item = listbox.get(index)
@@ -584,5 +1150,9 @@ class InventoryApp:
                 f"{item['id']} - {item['name']} - {item['condition']} - {item['card_number']} - Barcode: {item['barcode']}",
             )
 
+    def close(self):
+        self.executor.close()
+        self.root.destroy()
+
     def run(self):
         self.root.mainloop()